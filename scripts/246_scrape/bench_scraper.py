@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for scrape_collections.
+Drives the real scraper against a local stand-in server (standin_server.py)
+and reports req/s, p50/p99 latency, CPU per page and peak RSS.
+Each concurrency level runs in its own process, so peak RSS belongs to that level.
+With --baseline, exits non-zero when req/s drops (or RSS grows) by more than
+--max-regression percent.
+"""
+
+import aiohttp
+import asyncio
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import queue
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import scrape_24six_metadata as scraper
+from standin_server import StandinConfig, StandinServer
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def make_latency_trace(latencies: List[float]) -> aiohttp.TraceConfig:
+    """TraceConfig recording wall time of every collection request."""
+    trace = aiohttp.TraceConfig()
+
+    async def on_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_end(session, ctx, params):
+        if '/music/collection/' in params.url.path:
+            latencies.append(time.perf_counter() - ctx.start)
+
+    trace.on_request_start.append(on_start)
+    trace.on_request_end.append(on_end)
+    trace.on_request_exception.append(on_end)
+    return trace
+
+async def run_once(base_url: str, ids: int, concurrency: int, download_art: bool,
+                   collection_timeout: int, workdir: Path, quiet: bool) -> Dict:
+    """Run one scrape against the stand-in and return its measurements."""
+    latencies: List[float] = []
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    output = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        await scraper.scrape_collections(
+            1, ids, output_file=str(workdir / 'metadata.json'), csv_file=str(workdir / 'metadata.csv'),
+            concurrency=concurrency, download_art=download_art, art_dir=str(workdir / 'album_art'),
+            collection_timeout=collection_timeout, json_only=True,
+            base_url=base_url, trace_configs=[make_latency_trace(latencies)])
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return {
+        'concurrency': concurrency,
+        'pages': ids,
+        'wall_s': round(wall, 3),
+        'req_per_s': round(ids / wall, 1),
+        'http_requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'cpu_ms_per_page': round(cpu / ids * 1000, 3),
+        # ru_maxrss is KiB on Linux (bytes on macOS); high-water mark of this level's process
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def _run_level(kwargs: Dict, results: multiprocessing.Queue) -> None:
+    """Child process entry: one run_once in a fresh interpreter, result sent back on the queue."""
+    with tempfile.TemporaryDirectory() as tmp:
+        results.put(asyncio.run(run_once(workdir=Path(tmp), **kwargs)))
+
+def run_level(**kwargs) -> Dict:
+    """run_once in a spawned process so ru_maxrss is not carried over from earlier levels."""
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(target=_run_level, args=(kwargs, results))
+    process.start()
+    try:
+        while True:
+            try:
+                return results.get(timeout=1)
+            except queue.Empty:
+                if not process.is_alive():
+                    raise RuntimeError(f'benchmark process exited with code {process.exitcode}')
+    finally:
+        process.join()
+
+def print_report(results: List[Dict], baseline: List[Dict] = None, max_regression: float = None) -> List[str]:
+    """Print the table; returns a description of every level regressing beyond max_regression percent."""
+    print(f"{'conc':>5}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'cpu ms/pg':>11}{'rss MB':>9}")
+    base_by_conc = {r['concurrency']: r for r in (baseline or [])}
+    regressions = []
+    for r in results:
+        line = (f"{r['concurrency']:>5}{r['req_per_s']:>9.1f}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                f"{r['cpu_ms_per_page']:>11.3f}{r['peak_rss_mb']:>9.1f}")
+        base = base_by_conc.get(r['concurrency'])
+        if base:
+            delta = (r['req_per_s'] - base['req_per_s']) / base['req_per_s'] * 100
+            rss_delta = (r['peak_rss_mb'] - base['peak_rss_mb']) / base['peak_rss_mb'] * 100
+            line += f"   ({delta:+.1f}% req/s, {rss_delta:+.1f}% rss vs baseline)"
+            if max_regression is not None:
+                if -delta > max_regression:
+                    regressions.append(f"concurrency {r['concurrency']}: req/s {delta:+.1f}%")
+                if rss_delta > max_regression:
+                    regressions.append(f"concurrency {r['concurrency']}: peak RSS {rss_delta:+.1f}%")
+        print(line)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark scrape_collections against a local 24six stand-in server',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Default run: 2000 IDs at concurrency 40 and 80, 20ms latency, 30% 404s
+  python bench_scraper.py
+
+  # Flaky upstream with album art downloads
+  python bench_scraper.py --error-ratio 0.05 --timeout-ratio 0.01 --download-art
+
+  # CI: save results and compare against a stored baseline
+  python bench_scraper.py --json-out bench.json --baseline bench-main.json
+        """
+    )
+    parser.add_argument('--ids', type=int, default=2000, help='Collection IDs to scrape per run (default: 2000)')
+    parser.add_argument('--concurrency', type=str, default='40,80', help='Comma list of concurrency levels (default: 40,80)')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Mean server latency (default: 20)')
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help='Uniform latency jitter (default: 10)')
+    parser.add_argument('--not-found-ratio', type=float, default=0.3, help='Share of missing IDs (default: 0.3)')
+    parser.add_argument('--error-ratio', type=float, default=0.0, help='Share of 5xx responses (default: 0)')
+    parser.add_argument('--timeout-ratio', type=float, default=0.0, help='Share of hanging requests (default: 0)')
+    parser.add_argument('--collection-timeout', type=int, default=2, help='Scraper timeout; hangs exceed it (default: 2)')
+    parser.add_argument('--tracks', type=int, default=12, help='Tracks per synthetic collection (default: 12)')
+    parser.add_argument('--image-kb', type=int, default=50, help='Album art payload size in KiB (default: 50)')
+    parser.add_argument('--download-art', action='store_true', help='Also download album art')
+    parser.add_argument('--port', type=int, default=8624, help='Stand-in server port (default: 8624)')
+    parser.add_argument('--json-out', type=str, help='Write results as JSON for later comparison')
+    parser.add_argument('--baseline', type=str, help='Previous --json-out file to compare against')
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help='With --baseline, exit 1 if req/s drops or peak RSS grows by more than this percent (default: 10)')
+    parser.add_argument('--verbose', action='store_true', help='Show the scraper output')
+    args = parser.parse_args()
+
+    config = StandinConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           not_found_ratio=args.not_found_ratio, error_ratio=args.error_ratio,
+                           timeout_ratio=args.timeout_ratio, hang_s=args.collection_timeout + 1,
+                           tracks_per_collection=args.tracks, image_bytes=args.image_kb * 1024)
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+
+    results = []
+    with StandinServer(config, args.port) as server:
+        for concurrency in levels:
+            results.append(run_level(base_url=server.base_url, ids=args.ids, concurrency=concurrency,
+                                     download_art=args.download_art, collection_timeout=args.collection_timeout,
+                                     quiet=not args.verbose))
+        server_stats = asyncio.run(server.fetch_stats())
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    regressions = print_report(results, baseline, args.max_regression)
+    print(f"Server responses: {server_stats['by_status']}")
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+    if regressions:
+        print(f"❌ Regression beyond {args.max_regression}%: " + '; '.join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
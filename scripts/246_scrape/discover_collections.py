@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Discover live 24six collection IDs from listings instead of blind enumeration.
+Reads robots.txt/sitemaps, then crawls artist pages (/music/artist/ links) and
+collects every /music/collection/ link they point to. The scraper's --discover
+mode feeds the result straight into scrape_collections.
+"""
+
+import aiohttp
+import asyncio
+import argparse
+import gzip
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from output_formats import iter_records
+
+BASE_URL = 'https://24six.app'
+DEFAULT_SITEMAPS = ('/sitemap.xml',)
+MUSIC_LINK_RE = re.compile(r'/music/(collection|artist)/([A-Za-z0-9_-]+)')
+SITEMAP_RE = re.compile(r'^\s*sitemap:\s*(\S+)', re.IGNORECASE | re.MULTILINE)
+
+@dataclass
+class Discovery:
+    """Result of a discovery crawl."""
+    collection_ids: Set[int] = field(default_factory=set)
+    artists: Set[str] = field(default_factory=set)
+    artists_crawled: int = 0
+    sitemaps: int = 0
+    requests: int = 0
+    failures: int = 0
+
+    def add_links(self, text: str) -> List[str]:
+        """Record collection links in text; returns artist IDs not seen before."""
+        new_artists = []
+        for kind, value in MUSIC_LINK_RE.findall(text):
+            if kind == 'collection':
+                if value.isdigit():
+                    self.collection_ids.add(int(value))
+            elif value not in self.artists:
+                self.artists.add(value)
+                new_artists.append(value)
+        return new_artists
+
+def artist_id_from_url(url: str) -> Optional[str]:
+    """'https://24six.app/app/music/artist/123' -> '123'"""
+    match = MUSIC_LINK_RE.search(url or '')
+    return match.group(2) if match and match.group(1) == 'artist' else None
+
+def seeds_from_metadata(path: str) -> tuple:
+    """Artist IDs and collection IDs already known from a previous scrape output."""
+    artists, collections = [], []
+    for record in iter_records(path):
+        if record.get('status', 'success') != 'success':
+            continue
+        if record.get('collection_id') is not None:
+            collections.append(int(record['collection_id']))
+        artist = artist_id_from_url(record.get('artist_url'))
+        if artist:
+            artists.append(artist)
+    return list(dict.fromkeys(artists)), collections
+
+async def fetch_text(url: str, session: aiohttp.ClientSession, discovery: Discovery,
+                     max_retries: int = 2, timeout: int = 20) -> Optional[str]:
+    """GET url and return its body as text (gunzipped if needed); None on 404 or repeated failure."""
+    for attempt in range(max_retries + 1):
+        discovery.requests += 1
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status == 404:
+                    return None
+                if response.status == 200:
+                    body = await response.read()
+                    if body[:2] == b'\x1f\x8b':
+                        body = gzip.decompress(body)
+                    return body.decode('utf-8', errors='replace')
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        if attempt < max_retries:
+            await asyncio.sleep((2 ** attempt) * 0.5)
+    discovery.failures += 1
+    return None
+
+async def read_sitemaps(base_url: str, session: aiohttp.ClientSession, discovery: Discovery,
+                        timeout: int = 20) -> List[str]:
+    """Walk robots.txt sitemaps (and /sitemap.xml); returns artist IDs listed in them."""
+    robots = await fetch_text(f'{base_url}/robots.txt', session, discovery, max_retries=0, timeout=timeout)
+    pending = SITEMAP_RE.findall(robots or '') or [base_url + path for path in DEFAULT_SITEMAPS]
+    seen, artists = set(), []
+    while pending:
+        url = pending.pop()
+        if url in seen:
+            continue
+        seen.add(url)
+        text = await fetch_text(url, session, discovery, timeout=timeout)
+        if not text:
+            continue
+        discovery.sitemaps += 1
+        try:
+            root = ET.fromstring(text)
+        except ET.ParseError:
+            artists.extend(discovery.add_links(text))
+            continue
+        locs = [el.text.strip() for el in root.iter() if el.tag.endswith('loc') and el.text]
+        if root.tag.endswith('sitemapindex'):
+            pending.extend(locs)
+        else:
+            artists.extend(discovery.add_links('\n'.join(locs)))
+    return artists
+
+async def crawl_artists(base_url: str, session: aiohttp.ClientSession, discovery: Discovery,
+                        seeds: Iterable[str], concurrency: int = 20, max_artists: int = 0,
+                        timeout: int = 20, progress_every: int = 500) -> None:
+    """Breadth-first crawl of artist pages, following links to further artists."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for artist in seeds:
+        discovery.artists.add(artist)
+        queue.put_nowait(artist)
+
+    async def worker():
+        while True:
+            artist = await queue.get()
+            try:
+                if max_artists and discovery.artists_crawled >= max_artists:
+                    continue
+                discovery.artists_crawled += 1
+                text = await fetch_text(f'{base_url}/app/music/artist/{artist}', session, discovery, timeout=timeout)
+                if text:
+                    for new_artist in discovery.add_links(text):
+                        queue.put_nowait(new_artist)
+                if discovery.artists_crawled % progress_every == 0:
+                    print(f"  Artists crawled: {discovery.artists_crawled} | "
+                          f"collections found: {len(discovery.collection_ids)}", flush=True)
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        await queue.join()
+    finally:
+        for task in workers:
+            task.cancel()
+
+async def discover_collection_ids(base_url: str = BASE_URL, concurrency: int = 20, use_sitemap: bool = True,
+                                  seed_artists: Iterable[str] = (), seed_collections: Iterable[int] = (),
+                                  max_artists: int = 0, timeout: int = 20) -> Discovery:
+    """Build the set of live collection IDs from sitemaps, seeds and artist pages."""
+    discovery = Discovery()
+    discovery.collection_ids.update(seed_collections)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency, ttl_dns_cache=300)
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+        seeds = list(seed_artists)
+        if use_sitemap:
+            seeds += await read_sitemaps(base_url, session, discovery, timeout)
+        await crawl_artists(base_url, session, discovery, seeds, concurrency, max_artists, timeout)
+    return discovery
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Discovery options shared with the scraper's --discover mode."""
+    group = parser.add_argument_group('discovery')
+    group.add_argument('--seed-metadata', type=str, help='Previous scrape output to seed artist pages and known IDs from')
+    group.add_argument('--seed-artists', type=str, default='', help='Comma list of artist IDs to start crawling from')
+    group.add_argument('--no-sitemap', action='store_true', help='Skip robots.txt/sitemap discovery')
+    group.add_argument('--max-artists', type=int, default=0, help='Stop after crawling this many artist pages (default: no limit)')
+
+def run_from_args(args, base_url: str, concurrency: int, timeout: int = 20) -> Discovery:
+    """Run discovery with the options from add_arguments() and print a summary."""
+    seed_artists = [a.strip() for a in args.seed_artists.split(',') if a.strip()]
+    seed_collections: List[int] = []
+    if args.seed_metadata:
+        known_artists, seed_collections = seeds_from_metadata(args.seed_metadata)
+        seed_artists += known_artists
+
+    start = time.time()
+    print(f"Discovering collections from {base_url} "
+          f"({'sitemap + ' if not args.no_sitemap else ''}{len(seed_artists)} seed artists)", flush=True)
+    discovery = asyncio.run(discover_collection_ids(base_url, concurrency, not args.no_sitemap, seed_artists,
+                                                    seed_collections, args.max_artists, timeout))
+    print(f"Discovered {len(discovery.collection_ids)} collections from {discovery.artists_crawled} artist pages "
+          f"and {discovery.sitemaps} sitemaps in {time.time() - start:.1f}s "
+          f"({discovery.requests} requests, {discovery.failures} failed)", flush=True)
+    return discovery
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='List live 24six collection IDs by crawling sitemaps and artist pages',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Write discovered IDs (one per line)
+  python discover_collections.py --ids-out ids.txt
+
+  # Offline against the stand-in server
+  python standin_server.py --port 8624 &
+  python discover_collections.py --base-url http://127.0.0.1:8624 --ids-out ids.txt
+
+  # Discover and scrape in one step
+  python scrape_24six_metadata.py --discover --seed-metadata metadata.json
+        """
+    )
+    parser.add_argument('--base-url', type=str, default=BASE_URL, help=f'Site to crawl (default: {BASE_URL})')
+    parser.add_argument('--concurrency', type=int, default=20, help='Concurrent page requests (default: 20)')
+    parser.add_argument('--timeout', type=int, default=20, help='Timeout in seconds per request (default: 20)')
+    parser.add_argument('--ids-out', type=str, help='Write discovered collection IDs here, one per line')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.concurrency < 1:
+        print("Error: concurrency must be at least 1", file=sys.stderr)
+        sys.exit(1)
+
+    discovery = run_from_args(args, args.base_url.rstrip('/'), args.concurrency, args.timeout)
+    ids = sorted(discovery.collection_ids)
+    if ids:
+        print(f"ID range: {ids[0]}-{ids[-1]}")
+    if args.ids_out:
+        with open(args.ids_out, 'w', encoding='utf-8') as f:
+            f.write(''.join(f'{i}\n' for i in ids))
+        print(f"IDs saved to: {args.ids_out}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Merge sharded scraper outputs (metadata.shardIofN.json) into one file.
+Inputs are streamed and k-way merged by collection_id, so memory stays flat
+regardless of shard size. When the same ID appears in several inputs the
+record with the newest scraped_at wins (ties go to the later input).
+"""
+
+import argparse
+import csv
+import heapq
+import itertools
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from output_formats import RecordWriter, iter_records
+from scrape_24six_metadata import CSV_FIELDS
+
+STREAM_FORMATS = ('pretty', 'min', 'jsonl')
+
+def keyed_records(path: str, order: int) -> Iterator[Tuple[int, str, int, Dict]]:
+    """Yield (collection_id, scraped_at, input order, record), checking the input is sorted."""
+    previous = None
+    for record in iter_records(path):
+        if record.get('status', 'success') != 'success':
+            continue
+        cid = int(record['collection_id'])
+        if previous is not None and cid < previous:
+            raise ValueError(f"{path} is not sorted by collection_id ({cid} after {previous})")
+        previous = cid
+        yield cid, record.get('scraped_at') or '', order, record
+
+def merge_records(paths: List[str]) -> Iterator[Tuple[Dict, int]]:
+    """Yield (newest record, number of duplicates dropped) for each collection_id in ascending order."""
+    streams = [keyed_records(path, order) for order, path in enumerate(paths)]
+    merged = heapq.merge(*streams, key=lambda item: item[0])
+    for _, group in itertools.groupby(merged, key=lambda item: item[0]):
+        candidates = list(group)
+        newest = max(candidates, key=lambda item: (item[1], item[2]))
+        yield newest[3], len(candidates) - 1
+
+def merge_shards(paths: List[str], output_file: str, csv_file: str = None, output_format: str = 'pretty') -> Dict[str, int]:
+    """Merge shard files into output_file (and csv_file); returns counts."""
+    counts = {'records': 0, 'duplicates': 0}
+    csv_temp = csv_file + '.tmp' if csv_file else None
+    csv_handle = open(csv_temp, 'w', newline='', encoding='utf-8') if csv_file else None
+    try:
+        writer = csv.DictWriter(csv_handle, fieldnames=CSV_FIELDS, extrasaction='ignore') if csv_handle else None
+        if writer:
+            writer.writeheader()
+        with RecordWriter(output_file, output_format) as out:
+            for record, dropped in merge_records(paths):
+                out.write(record)
+                if writer:
+                    writer.writerow(record)
+                counts['records'] += 1
+                counts['duplicates'] += dropped
+    except BaseException:
+        if csv_handle:
+            csv_handle.close()
+            os.remove(csv_temp)
+        raise
+    if csv_handle:
+        csv_handle.close()
+        os.replace(csv_temp, csv_file)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Merge sharded 24six scraper outputs into one metadata file',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python merge_shards.py metadata.shard*of4.json --output metadata.json --csv metadata.csv
+
+  # Fold a fresh re-scrape into an existing file (newer scraped_at wins)
+  python merge_shards.py metadata.json metadata.shard1of1.json --output metadata.merged.json
+        """
+    )
+    parser.add_argument('inputs', nargs='+', help='Shard files (any format output_formats can read)')
+    parser.add_argument('--output', type=str, default='metadata.json', help='Merged JSON output (default: metadata.json)')
+    parser.add_argument('--csv', type=str, help='Also write a merged CSV file')
+    parser.add_argument('--format', choices=STREAM_FORMATS, default='pretty', help='Output format (default: pretty)')
+    args = parser.parse_args()
+
+    missing = [p for p in args.inputs if not os.path.exists(p)]
+    if missing:
+        print(f"Error: input not found: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+    if os.path.abspath(args.output) in {os.path.abspath(p) for p in args.inputs}:
+        print("Error: output must not be one of the inputs", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        counts = merge_shards(args.inputs, args.output, args.csv, args.format)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Merged {len(args.inputs)} files: {counts['records']} collections "
+          f"({counts['duplicates']} duplicates resolved)")
+    print(f"  - JSON: {args.output}")
+    if args.csv:
+        print(f"  - CSV: {args.csv}")
+
+if __name__ == '__main__':
+    main()
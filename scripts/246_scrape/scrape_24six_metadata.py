@@ -9,20 +9,72 @@ import asyncio
 from bs4 import BeautifulSoup
 import json
 import csv
-from datetime import datetime
+from datetime import datetime, timezone
 import argparse
 import sys
-from typing import List, Dict
+from typing import List, Dict, Sequence
 import time
 import os
 import re
 from pathlib import Path
 from urllib.parse import urlparse
 
+# Shared helpers live one directory up (scripts/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from output_formats import FORMATS, load_output, save_output, parse_precompress
+import metrics
+import progress_log
+from progress_log import log, ProgressLine
+import discover_collections
+import delta_feed
+import profiling
+
+BASE_URL = 'https://24six.app'
+PROGRESS_INTERVAL = 2.0  # seconds between progress lines
+CSV_FIELDS = ['collection_id', 'url', 'title', 'artist', 'publication_date', 'duration', 'image_url', 'album_art_file']
+SHARD_MODES = ('interleaved', 'blocked')
+
+FETCH_SECONDS = metrics.histogram('scrape_fetch_seconds', 'Collection page request latency per attempt')
+FETCH_RESPONSES = metrics.counter('scrape_responses_total', 'Collection page responses per attempt by HTTP status or error')
+FETCH_RESULTS = metrics.counter('scrape_results_total', 'Final collection results by status')
+FETCH_RETRIES = metrics.counter('scrape_retries_total', 'Collection fetch retries by attempt number')
+PARSE_SECONDS = metrics.histogram('scrape_parse_seconds', 'extract_metadata time per page (blocks the event loop)')
+IN_FLIGHT = metrics.gauge('scrape_in_flight', 'Requests currently holding the concurrency semaphore')
+ART_SECONDS = metrics.histogram('art_download_seconds', 'Album art request latency per attempt')
+ART_RESPONSES = metrics.counter('art_responses_total', 'Album art responses per attempt by HTTP status or error')
+ART_BYTES = metrics.counter('art_bytes_total', 'Album art bytes downloaded')
+SAVE_SECONDS = metrics.histogram('save_seconds', 'Time spent writing output files')
+
 # Force unbuffered output for real-time progress display
 sys.stdout.reconfigure(line_buffering=True) if hasattr(sys.stdout, 'reconfigure') else None
 os.environ['PYTHONUNBUFFERED'] = '1'
 
+def parse_shard(value: str):
+    """Parse a --shard argument "i/N" (1-based) into (index, count)."""
+    try:
+        index, count = (int(x) for x in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/N, got '{value}'")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and N, got '{value}'")
+    return index, count
+
+def shard_ids(ids: Sequence[int], index: int, count: int, mode: str = 'interleaved') -> Sequence[int]:
+    """IDs owned by shard index (1-based) of count; slicing keeps a range a range.
+
+    interleaved: every count-th ID (spreads dense and sparse ID regions evenly)
+    blocked:     one contiguous slice per shard
+    """
+    if mode == 'interleaved':
+        return ids[index - 1::count]
+    total = len(ids)
+    return ids[total * (index - 1) // count:total * index // count]
+
+def shard_path(path: str, index: int, count: int) -> str:
+    """metadata.json -> metadata.shard1of4.json"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.shard{index}of{count}{ext}"
+
 def sanitize_filename(filename: str) -> str:
     """Sanitize a string to be safe for use as a filename."""
     # Replace invalid filename characters with underscores
@@ -71,11 +123,15 @@ async def download_album_art(session: aiohttp.ClientSession, image_url: str,
         last_error = None
 
         for attempt in range(max_retries):
+            outcome = 'exception'
+            attempt_start = time.perf_counter()
             try:
                 # Download the image
                 async with session.get(image_url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    outcome = str(response.status)
                     if response.status == 200:
                         content = await response.read()
+                        ART_BYTES.inc(len(content))
 
                         # Save to file
                         with open(filepath, 'wb') as f:
@@ -94,11 +150,16 @@ async def download_album_art(session: aiohttp.ClientSession, image_url: str,
                             return {'status': last_error, 'collection_id': collection_id}
 
             except asyncio.TimeoutError:
+                outcome = 'timeout'
                 last_error = 'error_timeout'
             except aiohttp.ClientError as e:
+                outcome = 'client_error'
                 last_error = f'error_client_{str(e)[:30]}'
             except Exception as e:
                 last_error = f'error_{str(e)[:30]}'
+            finally:
+                ART_SECONDS.observe(time.perf_counter() - attempt_start, outcome=outcome)
+                ART_RESPONSES.inc(outcome=outcome)
 
             # Wait before retry with exponential backoff
             if attempt < max_retries - 1:
@@ -123,7 +184,8 @@ def extract_metadata(html_content):
         'duration': None,
         'image_url': None,
         'tracks': [],
-        'raw_json_ld': None
+        'raw_json_ld': None,
+        'artist_url': None
     }
 
     if json_ld:
@@ -169,10 +231,13 @@ def extract_metadata(html_content):
         if title_tag:
             metadata['title'] = title_tag.get_text(strip=True)
 
+    # Artist link (contains /music/artist/ in href); kept so discovery can crawl artist pages
+    artist_link = soup.find('a', href=lambda x: x and '/music/artist/' in x)
+    if artist_link:
+        metadata['artist_url'] = artist_link['href']
+
     # Extract artist from HTML if not found in JSON-LD
     if not metadata['artist']:
-        # Look for artist link (contains /music/artist/ in href)
-        artist_link = soup.find('a', href=lambda x: x and '/music/artist/' in x)
         if artist_link:
             # Extract only English text (first span with lang="en")
             en_span = artist_link.find('span', lang='en')
@@ -185,95 +250,144 @@ def extract_metadata(html_content):
     return metadata
 
 async def fetch_collection(collection_id: int, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
-                          max_retries: int = 3, timeout: int = 20) -> Dict:
+                          max_retries: int = 3, timeout: int = 20, base_url: str = BASE_URL) -> Dict:
     """Fetch a single collection's metadata asynchronously with retry logic."""
-    url = f"https://24six.app/app/music/collection/{collection_id}"
+    url = f"{base_url}/app/music/collection/{collection_id}"
 
     async with semaphore:  # Limit concurrent requests
-        last_error = None
-
-        for attempt in range(max_retries):
-            try:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
-                    if response.status == 200:
-                        html_content = await response.text()
+        IN_FLIGHT.inc()
+        try:
+            result = await _fetch_with_retries(collection_id, url, session, max_retries, timeout)
+        finally:
+            IN_FLIGHT.dec()
+        FETCH_RESULTS.inc(status='success' if result['status'] == 'success' else
+                          '404' if result['status'] == '404' else 'error')
+        return result
+
+async def _fetch_with_retries(collection_id: int, url: str, session: aiohttp.ClientSession,
+                              max_retries: int, timeout: int) -> Dict:
+    """Retry loop behind fetch_collection; records per-attempt metrics."""
+    last_error = None
+
+    for attempt in range(max_retries):
+        if attempt > 0:
+            FETCH_RETRIES.inc(attempt=attempt)
+        outcome = 'exception'
+        attempt_start = time.perf_counter()
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                outcome = str(response.status)
+                if response.status == 200:
+                    html_content = await response.text()
+                    with PARSE_SECONDS.time(), profiling.block('extract_metadata'):
                         metadata = extract_metadata(html_content)
-                        metadata['collection_id'] = collection_id
-                        metadata['url'] = url
-                        metadata['status'] = 'success'
-                        if attempt > 0:
-                            metadata['retries'] = attempt
-                        return metadata
-                    elif response.status == 404:
-                        # Don't retry 404s
-                        return {'collection_id': collection_id, 'url': url, 'status': '404'}
-                    else:
-                        last_error = f'error_http_{response.status}'
-                        # Don't retry client errors (4xx), only server errors (5xx)
-                        if 400 <= response.status < 500:
-                            return {'collection_id': collection_id, 'url': url, 'status': last_error}
-
-            except asyncio.TimeoutError:
-                last_error = 'error_timeout'
-            except aiohttp.ClientError as e:
-                last_error = f'error_client_{str(e)[:30]}'
-            except Exception as e:
-                last_error = f'error_{str(e)[:30]}'
-
-            # Wait before retry with exponential backoff
-            if attempt < max_retries - 1:
-                wait_time = (2 ** attempt) * 0.5  # 0.5s, 1s, 2s, etc.
-                await asyncio.sleep(wait_time)
-
-        # All retries exhausted
-        return {'collection_id': collection_id, 'url': url, 'status': f'{last_error}_after_{max_retries}_retries'}
-
-async def process_and_save(metadata, all_metadata, output_file, csv_file, counters, start_time, total_items, lock, download_counters=None, json_only=False, last_save_time=None):
-    """Process a single result and save periodically."""
+                    metadata['collection_id'] = collection_id
+                    metadata['url'] = url
+                    metadata['status'] = 'success'
+                    metadata['scraped_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+                    if attempt > 0:
+                        metadata['retries'] = attempt
+                    return metadata
+                elif response.status == 404:
+                    # Don't retry 404s
+                    return {'collection_id': collection_id, 'url': url, 'status': '404'}
+                else:
+                    last_error = f'error_http_{response.status}'
+                    # Don't retry client errors (4xx), only server errors (5xx)
+                    if 400 <= response.status < 500:
+                        return {'collection_id': collection_id, 'url': url, 'status': last_error}
+
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+            last_error = 'error_timeout'
+        except aiohttp.ClientError as e:
+            outcome = 'client_error'
+            last_error = f'error_client_{str(e)[:30]}'
+        except Exception as e:
+            last_error = f'error_{str(e)[:30]}'
+        finally:
+            FETCH_SECONDS.observe(time.perf_counter() - attempt_start, outcome=outcome)
+            FETCH_RESPONSES.inc(outcome=outcome)
+
+        # Wait before retry with exponential backoff
+        if attempt < max_retries - 1:
+            wait_time = (2 ** attempt) * 0.5  # 0.5s, 1s, 2s, etc.
+            await asyncio.sleep(wait_time)
+
+    # All retries exhausted
+    return {'collection_id': collection_id, 'url': url, 'status': f'{last_error}_after_{max_retries}_retries'}
+
+async def process_and_save(metadata, all_metadata, output_file, csv_file, counters, start_time, total_items, lock, download_counters=None, json_only=False, last_save_time=None,
+                           output_format='pretty', precompress=(), progress=None):
+    """Process a single result and save periodically.
+
+    Only bookkeeping and the periodic save happen under the lock; log lines are
+    handed to the background logger afterwards (per-item lines need --verbose).
+    """
+    saved_at = None
     async with lock:
         all_metadata.append(metadata)
 
         status = metadata['status']
         if status == 'success':
             counters['success'] += 1
-            print(f"✓ [{counters['success']}] {metadata['collection_id']}: {metadata.get('title', 'Unknown')}", flush=True)
+            item_msg = f"✓ [{counters['success']}] {metadata['collection_id']}: {metadata.get('title', 'Unknown')}"
         elif status == '404':
             counters['not_found'] += 1
-            print(f"✗ [{counters['not_found']}] {metadata['collection_id']}: Not found", flush=True)
+            item_msg = f"✗ [{counters['not_found']}] {metadata['collection_id']}: Not found"
         else:
             counters['error'] += 1
-            print(f"⚠ [{counters['error']}] {metadata['collection_id']}: {status}", flush=True)
+            item_msg = f"⚠ [{counters['error']}] {metadata['collection_id']}: {status}"
 
         # Save every 15 seconds
         current_time = time.time()
         if last_save_time.get('time', 0) == 0 or (current_time - last_save_time['time']) >= 15:
-            save_results(all_metadata, output_file, csv_file if not json_only else None)
+            with profiling.block('save_results'):
+                save_results(all_metadata, output_file, csv_file if not json_only else None, output_format, precompress)
             last_save_time['time'] = current_time
-            print(f"[SAVED] Progress saved at {len(all_metadata)} items", flush=True)
+            saved_at = len(all_metadata)
+
+    log.debug(item_msg)
+    if saved_at is not None:
+        log.info(f"[SAVED] Progress saved at {saved_at} items")
 
-        # Print progress summary every 10 items
-        if len(all_metadata) % 10 == 0:
-            elapsed = time.time() - start_time
-            processed = len(all_metadata)
-            rate = processed / elapsed if elapsed > 0 else 0
-            remaining = total_items - processed
-            eta = remaining / rate if rate > 0 else 0
+    def render_progress():
+        elapsed = time.time() - start_time
+        processed = len(all_metadata)
+        rate = processed / elapsed if elapsed > 0 else 0
+        remaining = total_items - processed
+        eta = remaining / rate if rate > 0 else 0
 
-            progress_msg = f"[Progress] {processed}/{total_items} | Rate: {rate:.1f}/s | ETA: {eta:.0f}s | " \
-                          f"✓{counters['success']} ✗{counters['not_found']} ⚠{counters['error']}"
+        progress_msg = f"[Progress] {processed}/{total_items} | Rate: {rate:.1f}/s | ETA: {eta:.0f}s | " \
+                      f"✓{counters['success']} ✗{counters['not_found']} ⚠{counters['error']}"
 
-            if download_counters:
-                progress_msg += f" | Art: ✓{download_counters['success']} ⚠{download_counters['error']}"
+        if download_counters:
+            progress_msg += f" | Art: ✓{download_counters['success']} ⚠{download_counters['error']}"
+        return progress_msg
 
-            print(progress_msg, flush=True)
+    # Progress summary at most every PROGRESS_INTERVAL seconds
+    if progress is not None:
+        progress.emit(render_progress)
 
 async def scrape_collections(start_id: int, end_id: int, output_file: str = 'metadata.json',
                             csv_file: str = 'metadata.csv', concurrency: int = 40,
                             batch_size: int = 500, download_art: bool = False,
                             art_dir: str = 'album_art', max_retries: int = 3,
                             collection_timeout: int = 20, art_timeout: int = 30,
-                            json_only: bool = False) -> None:
-    """Scrape metadata from a range of collection IDs using async/await with retry logic."""
+                            json_only: bool = False, output_format: str = 'pretty',
+                            precompress: tuple = (), on_result=None,
+                            base_url: str = BASE_URL, trace_configs: List = None,
+                            collection_ids: Sequence[int] = None) -> List[Dict]:
+    """Scrape metadata from a range of collection IDs using async/await with retry logic.
+    Returns every result, including 404s and errors.
+
+    collection_ids, if given, replaces start_id..end_id (e.g. one shard's IDs).
+
+    on_result, if given, is an async callable awaited with every result as soon as it
+    has been recorded, so downstream stages can start before the scrape finishes.
+    base_url and trace_configs exist so the scraper can be pointed at a local
+    stand-in server and timed (see bench_scraper.py).
+    """
 
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
@@ -283,9 +397,12 @@ async def scrape_collections(start_id: int, end_id: int, output_file: str = 'met
     counters = {'success': 0, 'not_found': 0, 'error': 0}
     download_counters = {'success': 0, 'error': 0} if download_art else None
     last_save_time = {'time': 0}
+    progress = ProgressLine(PROGRESS_INTERVAL)
     lock = asyncio.Lock()
 
-    total_items = end_id - start_id + 1
+    if collection_ids is None:
+        collection_ids = range(start_id, end_id + 1)
+    total_items = len(collection_ids)
 
     # Create album art directory if needed
     if download_art:
@@ -301,23 +418,27 @@ async def scrape_collections(start_id: int, end_id: int, output_file: str = 'met
     print("-" * 60, flush=True)
 
     start_time = time.time()
+    loop_monitor = profiling.start_loop_monitor()  # only with --profile
 
     # Create semaphore to limit concurrent requests
     semaphore = asyncio.Semaphore(concurrency)
 
     # Process in batches to avoid creating too many tasks at once
     connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
-    async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
+    async with aiohttp.ClientSession(headers=headers, connector=connector, trace_configs=trace_configs) as session:
 
-        for batch_start in range(start_id, end_id + 1, batch_size):
-            batch_end = min(batch_start + batch_size - 1, end_id)
+        for batch_start in range(0, total_items, batch_size):
+            batch_ids = collection_ids[batch_start:batch_start + batch_size]
 
             # Create tasks for this batch
             async def fetch_and_process(collection_id):
-                metadata = await fetch_collection(collection_id, session, semaphore, max_retries, collection_timeout)
+                metadata = await fetch_collection(collection_id, session, semaphore, max_retries, collection_timeout, base_url)
                 if not isinstance(metadata, Exception):
                     await process_and_save(metadata, all_metadata, output_file, csv_file,
-                                          counters, start_time, total_items, lock, download_counters, json_only, last_save_time)
+                                          counters, start_time, total_items, lock, download_counters, json_only, last_save_time,
+                                          output_format, precompress, progress)
+                    if on_result is not None:
+                        await on_result(metadata)
 
                     # Download album art if enabled and metadata was successful
                     if download_art and metadata.get('status') == 'success' and metadata.get('image_url'):
@@ -340,16 +461,20 @@ async def scrape_collections(start_id: int, end_id: int, output_file: str = 'met
 
             tasks = [
                 fetch_and_process(collection_id)
-                for collection_id in range(batch_start, batch_end + 1)
+                for collection_id in batch_ids
             ]
 
             # Execute batch concurrently
             await asyncio.gather(*tasks, return_exceptions=True)
 
     # Final save to ensure everything is saved
-    save_results(all_metadata, output_file, csv_file if not json_only else None)
+    with profiling.block('save_results'):
+        save_results(all_metadata, output_file, csv_file if not json_only else None, output_format, precompress)
+    if loop_monitor is not None:
+        loop_monitor.cancel()
 
     # Final summary
+    progress_log.flush_logging()
     elapsed = time.time() - start_time
 
     print("\n" + "=" * 60, flush=True)
@@ -370,7 +495,32 @@ async def scrape_collections(start_id: int, end_id: int, output_file: str = 'met
     if not json_only:
         print(f"  - CSV: {csv_file}", flush=True)
 
-def save_results(metadata_list, json_file, csv_file):
+    return all_metadata
+
+def write_delta(results: List[Dict], delta_file: str, fingerprints_file: str, output_format: str = 'pretty') -> Dict[str, int]:
+    """Diff results against the stored fingerprints, fold the changes into the pending delta and update the store.
+
+    Entries stay in the delta file until every consumer (fetch_youtube_links.py,
+    fetch_artist_ids_verified.py) has acked them, so advancing the fingerprints
+    here never loses a change a consumer has not processed yet.
+    """
+    store = delta_feed.FingerprintStore.load(fingerprints_file)
+    first_run = len(store) == 0
+    delta = delta_feed.build_delta(results, store)
+    acks = [delta_feed.DeltaAcks.load(delta_file, consumer) for consumer in delta_feed.CONSUMERS]
+    pending = [e for e in delta_feed.merge_delta(load_output(delta_file, default=[]), delta)
+               if not all(a.is_acked(e) for a in acks)]
+    # Written before the fingerprints: a crash in between re-detects the same changes
+    save_output(pending, delta_file, output_format)
+    store.save(output_format)
+    counts = delta_feed.summarize(delta)
+    print(f"\nDelta{' (first run, no previous fingerprints)' if first_run else ''}: "
+          f"+{counts['added']} added, ~{counts['changed']} changed, -{counts['removed']} removed", flush=True)
+    print(f"  - Delta: {delta_file} ({len(pending)} entries pending)", flush=True)
+    print(f"  - Fingerprints: {fingerprints_file} ({len(store)} collections)", flush=True)
+    return counts
+
+def save_results(metadata_list, json_file, csv_file, output_format='pretty', precompress=()):
     """Save results to JSON and CSV files atomically to prevent corruption."""
     # Save JSON (only successful items)
     successful_items = [m for m in metadata_list if m.get('status') == 'success']
@@ -378,26 +528,66 @@ def save_results(metadata_list, json_file, csv_file):
     # Sort by collection_id to maintain numerical order (1, 2, 3, 4, 5, etc.)
     successful_items.sort(key=lambda x: x.get('collection_id', 0))
 
-    # Write to temporary file first, then atomically rename
-    json_temp = json_file + '.tmp'
-    with open(json_temp, 'w', encoding='utf-8') as f:
-        json.dump(successful_items, f, indent=2, ensure_ascii=False)
-
-    # Atomic rename - if interrupted, old file remains intact
-    os.replace(json_temp, json_file)
+    # Written to a temporary file first, then atomically renamed
+    with SAVE_SECONDS.time(target='metadata_json'):
+        save_output(successful_items, json_file, output_format, precompress)
 
     # Save CSV (only successful items) if csv_file is provided
     if csv_file and successful_items:
         csv_temp = csv_file + '.tmp'
-        with open(csv_temp, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['collection_id', 'url', 'title', 'artist', 'publication_date', 'duration', 'image_url', 'album_art_file']
-            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        with SAVE_SECONDS.time(target='metadata_csv'), open(csv_temp, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
             writer.writeheader()
             writer.writerows(successful_items)
 
         # Atomic rename
         os.replace(csv_temp, csv_file)
 
+def run(args) -> None:
+    """Discover/shard the IDs, scrape them and write the delta."""
+    base_url = args.base_url.rstrip('/')
+    collection_ids = range(args.start, args.end + 1)
+    if args.discover:
+        with profiling.stage('discover'):
+            discovery = discover_collections.run_from_args(args, base_url, args.concurrency, args.collection_timeout)
+        collection_ids = sorted(discovery.collection_ids)
+        if not collection_ids:
+            print("Error: discovery found no collections", file=sys.stderr)
+            sys.exit(1)
+        args.start, args.end = collection_ids[0], collection_ids[-1]
+
+    if args.shard:
+        index, count = args.shard
+        collection_ids = shard_ids(collection_ids, index, count, args.shard_mode)
+        args.output = shard_path(args.output, index, count)
+        args.csv = shard_path(args.csv, index, count)
+        if args.delta:
+            args.delta = shard_path(args.delta, index, count)
+            args.fingerprints = shard_path(args.fingerprints, index, count)
+        print(f"Shard {index}/{count} ({args.shard_mode}): {len(collection_ids)} IDs", flush=True)
+
+    finish_metrics = metrics.start_from_args(args)
+    progress_log.setup_logging(args.verbose)
+    try:
+        with profiling.stage('scrape'):
+            results = asyncio.run(scrape_collections(args.start, args.end, args.output, args.csv,
+                                                     args.concurrency, args.batch_size,
+                                                     args.download_art, args.art_dir,
+                                                     args.max_retries, args.collection_timeout,
+                                                     args.art_timeout, args.json_only,
+                                                     args.format, args.precompress,
+                                                     base_url=base_url,
+                                                     collection_ids=collection_ids))
+    except KeyboardInterrupt:
+        print("\n\nScraping interrupted by user. Partial results have been saved.")
+        sys.exit(0)
+    finally:
+        finish_metrics()
+
+    if args.delta:
+        with profiling.stage('delta'):
+            write_delta(results, args.delta, args.fingerprints, args.format)
+
 def main():
     parser = argparse.ArgumentParser(
         description='High-speed concurrent metadata scraper for 24six.app music collections with retry logic',
@@ -410,6 +600,9 @@ Examples:
   # Download album art with proper naming (Artist - Title.jpg)
   python scrape_24six_metadata.py --start 1 --end 1000 --download-art
 
+  # Log every collection instead of a progress line every few seconds
+  python scrape_24six_metadata.py --start 1 --end 1000 --verbose
+
   # Save only JSON output (skip CSV)
   python scrape_24six_metadata.py --start 1 --end 1000 --json-only
 
@@ -422,6 +615,27 @@ Examples:
   # Conservative mode with 20 concurrent requests
   python scrape_24six_metadata.py --start 1 --end 5000 --concurrency 20
 
+  # Minified JSON plus precompressed siblings for static hosting
+  python scrape_24six_metadata.py --start 1 --end 1000 --format min --precompress gz,br
+
+  # Expose Prometheus metrics while scraping and keep a JSON snapshot
+  python scrape_24six_metadata.py --start 1 --end 5000 --metrics-port 9108 --metrics-file scrape-metrics.json
+
+  # Split a crawl across 4 machines/processes, then merge the shard outputs
+  python scrape_24six_metadata.py --start 1 --end 20000 --shard 1/4   # ... through --shard 4/4
+  python merge_shards.py metadata.shard*of4.json --output metadata.json --csv metadata.csv
+
+  # Crawl sitemaps and artist pages for live IDs, then fetch only those (--start/--end are ignored)
+  python scrape_24six_metadata.py --discover --seed-metadata metadata.json --output metadata.new.json
+
+  # Recrawl and emit only what changed since the last run (fingerprints kept in fingerprints.json)
+  python scrape_24six_metadata.py --start 1 --end 20000 --delta metadata.delta.json
+  python ../fetch_youtube_links.py --delta metadata.delta.json
+  python ../fetch_artist_ids_verified.py --delta metadata.delta.json
+
+  # Find out where time goes: per-stage cProfile, sampled stacks and event-loop lag in prof/report.txt
+  python scrape_24six_metadata.py --start 1 --end 2000 --profile prof
+
   # Custom output files and batch size
   python scrape_24six_metadata.py --start 1 --end 500 --output my_data.json --csv my_data.csv --batch-size 1000
 
@@ -432,6 +646,7 @@ Performance notes:
   - Timeouts: 20s for collections, 30s for album art (configurable)
   - Batch size controls how often progress is saved (default: 500)
   - Album art is named using extracted metadata: "Artist - Title.jpg"
+  - Measure throughput offline against a local stand-in server with bench_scraper.py
         """
     )
 
@@ -447,6 +662,21 @@ Performance notes:
     parser.add_argument('--collection-timeout', type=int, default=20, help='Timeout in seconds for collection fetches (default: 20)')
     parser.add_argument('--art-timeout', type=int, default=30, help='Timeout in seconds for album art downloads (default: 30)')
     parser.add_argument('--json-only', action='store_true', help='Save only JSON output (skip CSV file)')
+    progress_log.add_arguments(parser)
+    parser.add_argument('--base-url', type=str, default=BASE_URL, help=f'Site to scrape (default: {BASE_URL})')
+    parser.add_argument('--shard', type=parse_shard, help='Scrape only shard i of N (1-based, e.g. 2/4); outputs get a .shardIofN suffix')
+    parser.add_argument('--shard-mode', choices=SHARD_MODES, default='interleaved',
+                        help='How IDs are split between shards (default: interleaved)')
+    parser.add_argument('--discover', action='store_true',
+                        help='Find live IDs from sitemaps and artist pages instead of enumerating --start..--end')
+    discover_collections.add_arguments(parser)
+    parser.add_argument('--delta', type=str, help='Add collections added/changed/removed since the last run to this pending feed')
+    parser.add_argument('--fingerprints', type=str, default='fingerprints.json',
+                        help='Per-collection content fingerprints kept between runs (default: fingerprints.json)')
+    metrics.add_arguments(parser)
+    profiling.add_arguments(parser)
+    parser.add_argument('--format', choices=FORMATS, default='pretty', help='JSON output format (default: pretty)')
+    parser.add_argument('--precompress', type=parse_precompress, default=(), help='Also write compressed siblings, e.g. gz,br')
 
     args = parser.parse_args()
 
@@ -462,15 +692,12 @@ Performance notes:
         print("Error: batch size must be at least 1", file=sys.stderr)
         sys.exit(1)
 
+    finish_profile = profiling.start_from_args(args)
     try:
-        asyncio.run(scrape_collections(args.start, args.end, args.output, args.csv,
-                                       args.concurrency, args.batch_size,
-                                       args.download_art, args.art_dir,
-                                       args.max_retries, args.collection_timeout,
-                                       args.art_timeout, args.json_only))
-    except KeyboardInterrupt:
-        print("\n\nScraping interrupted by user. Partial results have been saved.")
-        sys.exit(0)
+        run(args)
+    finally:
+        # Also on Ctrl+C and early exits, so an interrupted run still gets its report
+        finish_profile()
 
 if __name__ == '__main__':
     main()
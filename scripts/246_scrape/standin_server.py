@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for 24six.app serving synthetic collection pages.
+Used by bench_scraper.py to measure the scraper offline.
+Also serves artist pages, robots.txt and a sitemap so discover_collections.py
+can be exercised without touching the real site.
+"""
+
+import aiohttp
+from aiohttp import web
+import asyncio
+import argparse
+import hashlib
+import json
+import multiprocessing
+import random
+from dataclasses import dataclass, asdict
+from typing import Dict, List
+
+@dataclass
+class StandinConfig:
+    """Behaviour of the stand-in server. Ratios are fractions of requests (0-1)."""
+    seed: int = 1
+    latency_ms: float = 20.0          # mean response latency
+    jitter_ms: float = 10.0           # +/- uniform jitter
+    not_found_ratio: float = 0.3      # share of collection IDs that do not exist
+    error_ratio: float = 0.0          # per-request 5xx responses
+    timeout_ratio: float = 0.0        # per-request hangs (longer than hang_s)
+    hang_s: float = 30.0
+    tracks_per_collection: int = 12
+    image_bytes: int = 50_000         # album art payload size
+    max_collection_id: int = 20000    # highest live ID (artist pages and sitemap cover 1..max)
+    sitemap_artist_ratio: float = 1.0 # share of artists listed in the sitemap
+    related_artists: int = 3          # "related artist" links per artist page
+
+def _stable_fraction(seed: int, *parts) -> float:
+    """Deterministic value in [0, 1) derived from the seed and parts."""
+    digest = hashlib.sha1(f"{seed}:{':'.join(map(str, parts))}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+def collection_exists(config: StandinConfig, collection_id: int) -> bool:
+    """Whether a collection ID is live on the stand-in (stable for a given seed)."""
+    return _stable_fraction(config.seed, 'exists', collection_id) >= config.not_found_ratio
+
+def artist_for(config: StandinConfig, collection_id: int) -> int:
+    """Artist ID owning a collection (roughly 8 collections per artist)."""
+    return int(_stable_fraction(config.seed, 'artist', collection_id) * max(1, collection_id // 8 + 1)) + 1
+
+def build_artist_index(config: StandinConfig) -> Dict[int, List[int]]:
+    """Map each artist ID to its live collection IDs (ascending)."""
+    index: Dict[int, List[int]] = {}
+    for collection_id in range(1, config.max_collection_id + 1):
+        if collection_exists(config, collection_id):
+            index.setdefault(artist_for(config, collection_id), []).append(collection_id)
+    return index
+
+def related_artists(config: StandinConfig, artist_id: int, artist_ids: List[int]) -> List[int]:
+    """Deterministic 'related artist' links, so artist pages form a crawlable graph."""
+    picks = [artist_ids[int(_stable_fraction(config.seed, 'related', artist_id, n) * len(artist_ids))]
+             for n in range(config.related_artists)]
+    return [a for a in dict.fromkeys(picks) if a != artist_id]
+
+def render_artist(config: StandinConfig, artist_id: int, collections: List[int], related: List[int]) -> str:
+    """HTML page shaped like a 24six artist page: links to its collections and related artists."""
+    return (
+        f'<!DOCTYPE html><html><head><title>Artist {artist_id}</title></head><body>'
+        f'<h1><span lang="en">Artist {artist_id}</span></h1><ul class="collections">'
+        + ''.join(f'<li><a href="/app/music/collection/{c}">Album {c}</a></li>' for c in collections)
+        + '</ul><ul class="related">'
+        + ''.join(f'<li><a href="/app/music/artist/{a}">Artist {a}</a></li>' for a in related)
+        + '</ul></body></html>'
+    )
+
+def render_sitemap(locs: List[str], index: bool = False) -> str:
+    """Sitemap (or sitemap index) XML listing locs."""
+    tag, item = ('sitemapindex', 'sitemap') if index else ('urlset', 'url')
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>'
+        f'<{tag} xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        + ''.join(f'<{item}><loc>{loc}</loc></{item}>' for loc in locs)
+        + f'</{tag}>'
+    )
+
+def render_collection(config: StandinConfig, base_url: str, collection_id: int) -> str:
+    """HTML page shaped like a real 24six collection page."""
+    artist_id = artist_for(config, collection_id)
+    json_ld = {
+        '@context': 'https://schema.org',
+        '@type': 'MusicAlbum',
+        'name': f'Album {collection_id}',
+        'image': f'{base_url}/img/{collection_id}.jpg',
+        'datePublished': '2024-01-01',
+        'duration': 'PT45M',
+        'byArtist': {'@type': 'MusicGroup', 'name': f'Artist {artist_id}'},
+        'track': [{'@type': 'MusicRecording', 'name': f'Track {collection_id}-{n}', 'duration': 'PT3M30S'}
+                  for n in range(1, config.tracks_per_collection + 1)],
+    }
+    return (
+        '<!DOCTYPE html><html><head><title>24six</title>'
+        f'<script type="application/ld+json">{json.dumps(json_ld)}</script></head><body>'
+        f'<h1>Album {collection_id}</h1>'
+        f'<a href="/app/music/artist/{artist_id}"><span lang="en">Artist {artist_id}</span></a>'
+        + '<div class="filler">' + ('x' * 2000) + '</div>'
+        + '</body></html>'
+    )
+
+def make_app(config: StandinConfig) -> web.Application:
+    """Build the aiohttp application implementing the stand-in routes."""
+    rng = random.Random(config.seed)
+    image = bytes(rng.getrandbits(8) for _ in range(config.image_bytes))
+    stats = {'requests': 0, 'by_status': {}, 'by_route': {}}
+    artist_index = build_artist_index(config)
+    artist_ids = sorted(artist_index)
+
+    async def delay():
+        await asyncio.sleep(max(0.0, config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)) / 1000)
+
+    def count(status, route='collection'):
+        stats['requests'] += 1
+        stats['by_status'][str(status)] = stats['by_status'].get(str(status), 0) + 1
+        stats['by_route'][route] = stats['by_route'].get(route, 0) + 1
+
+    async def injected_failure():
+        """Return a failure response for this request, or None."""
+        roll = rng.random()
+        if roll < config.timeout_ratio:
+            await asyncio.sleep(config.hang_s)
+            count('hang')
+            return web.Response(status=504)
+        if roll < config.timeout_ratio + config.error_ratio:
+            count(503)
+            return web.Response(status=503, text='Service Unavailable')
+        return None
+
+    async def collection(request):
+        await delay()
+        failure = await injected_failure()
+        if failure is not None:
+            return failure
+        collection_id = int(request.match_info['collection_id'])
+        if collection_id > config.max_collection_id or not collection_exists(config, collection_id):
+            count(404)
+            return web.Response(status=404, text='Not Found')
+        count(200)
+        base_url = f'{request.scheme}://{request.host}'
+        return web.Response(text=render_collection(config, base_url, collection_id), content_type='text/html')
+
+    async def album_art(request):
+        await delay()
+        failure = await injected_failure()
+        if failure is not None:
+            return failure
+        count(200, 'art')
+        return web.Response(body=image, content_type='image/jpeg')
+
+    async def artist(request):
+        await delay()
+        failure = await injected_failure()
+        if failure is not None:
+            return failure
+        artist_id = int(request.match_info['artist_id'])
+        collections = artist_index.get(artist_id)
+        if collections is None:
+            count(404, 'artist')
+            return web.Response(status=404, text='Not Found')
+        count(200, 'artist')
+        page = render_artist(config, artist_id, collections, related_artists(config, artist_id, artist_ids))
+        return web.Response(text=page, content_type='text/html')
+
+    async def robots(request):
+        count(200, 'sitemap')
+        base_url = f'{request.scheme}://{request.host}'
+        return web.Response(text=f'User-agent: *\nAllow: /\nSitemap: {base_url}/sitemap.xml\n')
+
+    async def sitemap_index(request):
+        count(200, 'sitemap')
+        base_url = f'{request.scheme}://{request.host}'
+        return web.Response(text=render_sitemap([f'{base_url}/sitemap-artists.xml'], index=True),
+                            content_type='application/xml')
+
+    async def sitemap_artists(request):
+        count(200, 'sitemap')
+        base_url = f'{request.scheme}://{request.host}'
+        listed = [a for a in artist_ids if _stable_fraction(config.seed, 'sitemap', a) < config.sitemap_artist_ratio]
+        return web.Response(text=render_sitemap([f'{base_url}/app/music/artist/{a}' for a in listed]),
+                            content_type='application/xml')
+
+    async def server_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app['config'] = config
+    app['stats'] = stats
+    app.router.add_get('/app/music/collection/{collection_id:\\d+}', collection)
+    app.router.add_get('/img/{collection_id:\\d+}.jpg', album_art)
+    app.router.add_get('/app/music/artist/{artist_id:\\d+}', artist)
+    app.router.add_get('/robots.txt', robots)
+    app.router.add_get('/sitemap.xml', sitemap_index)
+    app.router.add_get('/sitemap-artists.xml', sitemap_artists)
+    app.router.add_get('/_stats', server_stats)
+    return app
+
+def _serve(config_dict: dict, port: int, ready) -> None:
+    async def run():
+        runner = web.AppRunner(make_app(StandinConfig(**config_dict)), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        ready.set()
+        while True:
+            await asyncio.sleep(3600)
+    asyncio.run(run())
+
+class StandinServer:
+    """Runs the stand-in in a child process so its CPU does not count against the scraper."""
+
+    def __init__(self, config: StandinConfig, port: int = 8624):
+        self.config = config
+        self.port = port
+        self.process = None
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    def __enter__(self):
+        ready = multiprocessing.Event()
+        self.process = multiprocessing.Process(target=_serve, args=(asdict(self.config), self.port, ready), daemon=True)
+        self.process.start()
+        if not ready.wait(timeout=15):
+            self.process.terminate()
+            raise RuntimeError('stand-in server did not start')
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.join(timeout=5)
+
+    async def fetch_stats(self) -> dict:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f'{self.base_url}/_stats') as response:
+                return await response.json()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve synthetic 24six collection pages locally')
+    parser.add_argument('--port', type=int, default=8624, help='Port to listen on (default: 8624)')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Mean response latency (default: 20)')
+    parser.add_argument('--not-found-ratio', type=float, default=0.3, help='Share of missing IDs (default: 0.3)')
+    parser.add_argument('--error-ratio', type=float, default=0.0, help='Share of 5xx responses (default: 0)')
+    parser.add_argument('--timeout-ratio', type=float, default=0.0, help='Share of hanging requests (default: 0)')
+    parser.add_argument('--max-collection-id', type=int, default=20000, help='Highest live collection ID (default: 20000)')
+    parser.add_argument('--sitemap-artist-ratio', type=float, default=1.0,
+                        help='Share of artists listed in the sitemap; the rest are only reachable by links (default: 1)')
+    args = parser.parse_args()
+
+    config = StandinConfig(latency_ms=args.latency_ms, not_found_ratio=args.not_found_ratio,
+                           error_ratio=args.error_ratio, timeout_ratio=args.timeout_ratio,
+                           max_collection_id=args.max_collection_id,
+                           sitemap_artist_ratio=args.sitemap_artist_ratio)
+    print(f"Serving stand-in on http://127.0.0.1:{args.port} (Ctrl+C to stop)")
+    web.run_app(make_app(config), host='127.0.0.1', port=args.port, access_log=None, print=None)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Lookup Service Benchmark
+========================
+
+- Builds a synthetic catalogue (or uses real metadata/links/artists files)
+- Times each Index lookup in-process (µs per call, no HTTP)
+- Runs lookup_service.py in a child process and drives it with concurrent
+  aiohttp clients for a fixed duration: sustained QPS, p50/p99 latency, errors
+- --touch-every S bumps the links file's mtime during the run to measure
+  lookups while the index hot-reloads
+
+Examples:
+    python bench_lookup.py
+    python bench_lookup.py --artists 2000 --concurrency 64 --duration 20
+    python bench_lookup.py --metadata metadata.json --links youtube-links-optimized.json --artists-file artists.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from urllib.parse import quote
+
+import aiohttp
+from aiohttp import web
+
+from bench_ytm import synthetic_metadata
+import lookup_service
+
+# -----------------------
+# Corpus
+# -----------------------
+def _fake_id(length, text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:length]
+
+def write_synthetic(workdir, artists, albums, tracks, link_rate=0.7):
+    """metadata.json, links and artists.json for a synthetic catalogue; returns their paths."""
+    metadata = synthetic_metadata(artists, albums, tracks)
+    links = {}
+    for album in metadata:
+        for track in album["tracks"]:
+            key = f"{album['artist']}|{track['name']}"
+            if random.random() < link_rate:
+                links[key] = {"artist": album["artist"], "track": track["name"],
+                              "url": f"https://music.youtube.com/watch?v={_fake_id(11, key)}"}
+    verified = {"artists": [{"id": "UC" + _fake_id(22, f"Artist {a}"), "name": f"Artist {a}"}
+                            for a in range(1, artists + 1, 2)]}
+    paths = {name: os.path.join(workdir, name) for name in ("metadata.json", "links.json", "artists.json")}
+    for name, data in (("metadata.json", metadata), ("links.json", links), ("artists.json", verified)):
+        with open(paths[name], "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+    return paths["metadata.json"], paths["links.json"], paths["artists.json"]
+
+def build_requests(index, count, seed=1):
+    """A mixed request list: (kind, path, index call) drawn from what the index holds."""
+    rng = random.Random(seed)
+    artists = index.artists
+    cids = list(index.collections)
+    videos = list(index.videos)
+    channels = list(index.channels)
+    requests = []
+    for _ in range(count):
+        kind = rng.choice(("artist", "artist_linked", "prefix", "track", "collection", "video", "channel"))
+        if kind.startswith("artist"):
+            name = rng.choice(artists)
+            linked = kind == "artist_linked"
+            requests.append((kind, f"/artists/{quote(name, safe='')}" + ("?linked=1" if linked else ""),
+                             (index.artist, name, linked)))
+        elif kind == "prefix":
+            prefix = rng.choice(artists)[:3]
+            requests.append((kind, f"/artists?prefix={quote(prefix)}", (index.find_artists, prefix)))
+        elif kind == "track":
+            cid = rng.choice(cids)
+            _, _, tracks = index.collections[cid]
+            name = rng.choice(tracks)[0] if tracks else "missing"
+            requests.append((kind, f"/tracks?name={quote(name)}", (index.track, name)))
+        elif kind == "collection":
+            cid = rng.choice(cids)
+            requests.append((kind, f"/collections/{cid}", (index.collection, cid)))
+        elif kind == "video" and videos:
+            vid = rng.choice(videos)
+            requests.append((kind, f"/videos/{vid}", (index.video, vid)))
+        elif kind == "channel" and channels:
+            channel_id = rng.choice(channels)
+            requests.append((kind, f"/channels/{channel_id}", (index.channel, channel_id)))
+    return requests
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+# -----------------------
+# Benchmarks
+# -----------------------
+def bench_index(requests, repeat=3):
+    """Per-kind µs per in-process lookup (best of repeat passes)."""
+    by_kind = {}
+    for kind, _, call in requests:
+        by_kind.setdefault(kind, []).append(call)
+    results = {}
+    for kind, calls in by_kind.items():
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for fn, *args in calls:
+                fn(*args)
+            best = min(best, time.perf_counter() - start)
+        results[kind] = round(best / len(calls) * 1e6, 1)
+    return results
+
+def _serve(sources, port, ready):
+    async def run():
+        service = lookup_service.LookupService(reload_interval=0.5, **sources)
+        service.load()
+        runner = web.AppRunner(lookup_service.create_app(service), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        ready.set()
+        while True:
+            await asyncio.sleep(3600)
+    asyncio.run(run())
+
+async def drive(base_url, requests, concurrency, duration, touch_path=None, touch_every=0):
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def client(offset):
+        nonlocal errors
+        i = offset
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=1)) as session:
+            while time.perf_counter() < stop_at:
+                _, path, _ = requests[i % len(requests)]
+                i += concurrency
+                start = time.perf_counter()
+                try:
+                    async with session.get(base_url + path) as response:
+                        await response.read()
+                        if response.status >= 500:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+    async def toucher():
+        while time.perf_counter() < stop_at:
+            await asyncio.sleep(touch_every)
+            os.utime(touch_path)
+
+    tasks = [client(n) for n in range(concurrency)]
+    if touch_path and touch_every > 0:
+        tasks.append(toucher())
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    async with aiohttp.ClientSession() as session:
+        async with session.get(base_url + "/stats") as response:
+            stats = await response.json()
+    return {
+        "requests": len(latencies),
+        "qps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "errors": errors,
+        "reloads": stats["reloads"],
+    }
+
+# -----------------------
+# Main
+# -----------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lookup_service.py in-process and over HTTP")
+    parser.add_argument("--metadata", help="Use real metadata.json instead of a synthetic corpus")
+    parser.add_argument("--links", help="Links file to join with --metadata")
+    parser.add_argument("--artists-file", help="Verified artists for channel lookups")
+    parser.add_argument("--artists", type=int, default=500, help="Synthetic artists (default: 500)")
+    parser.add_argument("--albums", type=int, default=4, help="Synthetic albums per artist (default: 4)")
+    parser.add_argument("--tracks", type=int, default=12, help="Synthetic tracks per album (default: 12)")
+    parser.add_argument("--requests", type=int, default=5000, help="Distinct requests in the mix (default: 5000)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent HTTP clients (default: 32)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of sustained load (default: 10)")
+    parser.add_argument("--touch-every", type=float, default=0.0, help="Touch the links file every S seconds to force reloads")
+    parser.add_argument("--port", type=int, default=8625, help="Port for the service (default: 8625)")
+    parser.add_argument("--json-out", help="Write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.metadata:
+            metadata, links, artists = args.metadata, args.links, args.artists_file
+        else:
+            random.seed(1)
+            metadata, links, artists = write_synthetic(workdir, args.artists, args.albums, args.tracks)
+        sources = {"metadata": metadata, "links": links, "artists": artists}
+
+        start = time.perf_counter()
+        index = lookup_service.build_index(**sources)
+        print(f"Indexed in {time.perf_counter() - start:.2f}s: {index.stats()}")
+        requests = build_requests(index, args.requests)
+
+        index_us = bench_index(requests)
+        print("\nIn-process lookups (µs per call):")
+        for kind, us in sorted(index_us.items()):
+            print(f"  {kind:>14} {us:>10.1f}")
+
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(target=_serve, args=(sources, args.port, ready), daemon=True)
+        process.start()
+        try:
+            if not ready.wait(timeout=120):
+                raise RuntimeError("lookup service did not start")
+            touch = links if args.touch_every and links else None
+            http = asyncio.run(drive(f"http://127.0.0.1:{args.port}", requests, args.concurrency,
+                                     args.duration, touch, args.touch_every))
+        finally:
+            process.terminate()
+            process.join(timeout=5)
+
+    print(f"\nHTTP ({args.concurrency} clients, {args.duration:.0f}s): {http['qps']} req/s, "
+          f"p50 {http['p50_ms']}ms, p99 {http['p99_ms']}ms, {http['errors']} errors, "
+          f"{http['reloads']} reloads ({http['requests']} requests)")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "index_us": index_us, "http": http}, f, indent=2)
+        print(f"\nResults saved to: {args.json_out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Offline Link / Artist Resolution Benchmark
+==========================================
+
+- Runs fetch_youtube_links.resolve_tracks and fetch_artist_ids_verified.process_artist
+  against the deterministic FakeYTMusic backend (no network)
+- Sweeps thread counts and limiter (delay) settings
+- Compares global search with channel-scoped resolution (every synthetic artist
+  gets a verified channel holding their catalogue)
+- Reports tracks/sec, API calls per track, searches per resolved track, artists/sec
+- --throttle-every N makes the fake return 429s for --throttle-s seconds every N
+  calls, exercising the circuit breaker (trips, tracks deferred to the next run)
+
+Examples:
+    python bench_ytm.py
+    python bench_ytm.py --threads 4,8,16 --limiter 0.05/0.02/0.08,0/0/0 --latency-ms 80
+    python bench_ytm.py --metadata metadata.json --failure-rate 0.02
+    python bench_ytm.py --throttle-every 300 --throttle-s 1 --breaker-cooldown 0.5
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("YTM_BACKEND", "fake")
+
+import fetch_youtube_links as links
+import fetch_artist_ids_verified as verifier
+from ytm_backend import FakeYTMusic
+from metadata_reader import iter_collections
+from channel_catalogue import ChannelCatalogue
+from circuit_breaker import Throttled
+
+# -----------------------
+# Corpus
+# -----------------------
+def synthetic_metadata(artists, albums, tracks):
+    metadata = []
+    cid = 0
+    for a in range(1, artists + 1):
+        for b in range(1, albums + 1):
+            cid += 1
+            metadata.append({
+                "collection_id": cid,
+                "status": "success",
+                "artist": f"Artist {a}",
+                "title": f"Album {a}-{b}",
+                "tracks": [{"name": f"Song {a}-{b}-{t}"} for t in range(1, tracks + 1)],
+            })
+    return metadata
+
+def build_queue(metadata, limit):
+    queue = list(dict.fromkeys(
+        (album.get("artist"), track.get("name"))
+        for album in metadata
+        for track in album.get("tracks", []) or []
+        if album.get("artist") and track.get("name")
+    ))
+    return queue[:limit] if limit else queue
+
+def build_discography(metadata):
+    disco = {}
+    for album in metadata:
+        artist = album.get("artist")
+        if not artist:
+            continue
+        entry = disco.setdefault(artist, {"albums": [], "tracks": []})
+        if album.get("title"):
+            entry["albums"].append(album["title"])
+        entry["tracks"].extend(t["name"] for t in album.get("tracks", []) or [] if t.get("name"))
+    return disco
+
+def build_catalogue(metadata):
+    """artist -> {album title: [track names]} for the fake's channels"""
+    catalogue = {}
+    for album in metadata:
+        if album.get("artist") and album.get("title"):
+            tracks = [t["name"] for t in album.get("tracks", []) or [] if t.get("name")]
+            catalogue.setdefault(album["artist"], {})[album["title"]] = tracks
+    return catalogue
+
+def reset_breaker(cooldown):
+    """Fresh breaker state per run; the bench's throttle windows are seconds, not minutes."""
+    links.breaker.reset()
+    links.breaker.configure(cooldown=cooldown, max_cooldown=max(cooldown * 8, 1.0), recovery_interval=cooldown / 50)
+
+def parse_limiter(value):
+    base, low, high = (float(x) for x in value.split("/"))
+    return base, (low, high)
+
+# -----------------------
+# Benchmarks
+# -----------------------
+def bench_links(queue, threads, limiter, fake_options, workdir, mode="search", catalogue=None, cooldown=1.0):
+    fake = FakeYTMusic(catalogue=catalogue if mode == "channel" else None, **fake_options)
+    links.ytm = fake
+    reset_breaker(cooldown)
+    if mode == "channel":
+        links.channel_ids = {artist: fake.channel_id(artist) for artist in catalogue}
+        links.channels = ChannelCatalogue(fake, cache_path=None, breaker=links.breaker)
+    else:
+        links.channel_ids, links.channels = {}, None
+    links.MAX_THREADS = threads
+    links.DELAY_BASE, links.DELAY_JITTER = limiter
+    links.BATCH_SAVE = len(queue) + 1
+    links.OUTPUT_FILE = os.path.join(workdir, "links.json")
+    links.NOT_FOUND_LOG = os.path.join(workdir, "not_found.txt")
+    links.EVENT_LOG = os.path.join(workdir, "link_log.jsonl")
+
+    youtube_links = {}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        processed, found = links.resolve_tracks(queue, youtube_links, 0, len(queue), len(queue), time.time())
+    elapsed = time.perf_counter() - start
+    links.close_logs()
+
+    calls = fake.stats()
+    api_calls = sum(v for k, v in calls.items() if k not in ("failures", "throttled"))
+    return {
+        "mode": mode,
+        "threads": threads,
+        "limiter": f"{limiter[0]}/{limiter[1][0]}/{limiter[1][1]}",
+        "tracks": processed,
+        "found": found,
+        "tracks_per_s": round(processed / elapsed, 1),
+        "calls_per_track": round(api_calls / max(processed, 1), 2),
+        "searches_per_track": round(calls.get("search", 0) / max(processed, 1), 2),
+        "searches_per_resolved": round(calls.get("search", 0) / max(found, 1), 2),
+        "failures": calls.get("failures", 0),
+        "throttled": calls.get("throttled", 0),
+        "breaker_trips": links.breaker.trips,
+        "deferred": len(queue) - processed,
+    }
+
+def bench_artists(discography, threads, fake_options, cooldown=1.0):
+    catalogue = {artist: d["albums"] for artist, d in discography.items()}
+    fake = FakeYTMusic(catalogue=catalogue, **fake_options)
+    verifier.ytm = fake
+    reset_breaker(cooldown)
+
+    def verify(item):
+        # Retried in place, as pipeline.py does
+        for _ in range(verifier.MAX_REQUEUES + 1):
+            try:
+                return verifier.process_artist(*item)
+            except Throttled:
+                continue
+        return None
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(verify, discography.items()))
+    elapsed = time.perf_counter() - start
+
+    verified = sum(1 for r in results if r and r["confidence"]["total"] >= 70)
+    calls = fake.stats()
+    return {
+        "threads": threads,
+        "artists": len(results),
+        "verified": verified,
+        "artists_per_s": round(len(results) / elapsed, 1),
+        "calls_per_artist": round((calls.get("search", 0) + calls.get("get_artist", 0)) / max(len(results), 1), 2),
+    }
+
+# -----------------------
+# Main
+# -----------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark link and artist resolution against a fake YTMusic backend")
+    parser.add_argument("--metadata", help="Use a real metadata.json instead of a synthetic corpus")
+    parser.add_argument("--artists", type=int, default=40, help="Synthetic artists (default: 40)")
+    parser.add_argument("--albums", type=int, default=3, help="Synthetic albums per artist (default: 3)")
+    parser.add_argument("--tracks", type=int, default=10, help="Synthetic tracks per album (default: 10)")
+    parser.add_argument("--limit", type=int, default=0, help="Cap on tracks resolved per run (default: all)")
+    parser.add_argument("--threads", default="1,8,16", help="Comma list of thread counts (default: 1,8,16)")
+    parser.add_argument("--limiter", default=f"{links.DELAY_BASE}/{links.DELAY_JITTER[0]}/{links.DELAY_JITTER[1]},0/0/0",
+                        help="Comma list of BASE/JITTER_MIN/JITTER_MAX delays (default: script setting and off)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Fake call latency (default: 50)")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Fake latency jitter (default: 20)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of calls raising transient errors (default: 0)")
+    parser.add_argument("--hit-rate", type=float, default=0.8, help="Share of tracks the fake can resolve (default: 0.8)")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Fake opens a 429 window every N calls (default: off)")
+    parser.add_argument("--throttle-s", type=float, default=2.0, help="Length of each 429 window (default: 2)")
+    parser.add_argument("--breaker-cooldown", type=float, default=1.0, help="Circuit breaker cooldown for the bench (default: 1)")
+    parser.add_argument("--modes", default="search,channel", help="Comma list of link modes: search, channel (default: both)")
+    parser.add_argument("--skip-artists", action="store_true", help="Only benchmark link resolution")
+    parser.add_argument("--json-out", help="Write results as JSON")
+    args = parser.parse_args()
+
+    if args.metadata:
+        metadata = list(iter_collections(args.metadata))
+    else:
+        metadata = synthetic_metadata(args.artists, args.albums, args.tracks)
+
+    fake_options = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+                    "failure_rate": args.failure_rate, "hit_rate": args.hit_rate,
+                    "throttle_every": args.throttle_every, "throttle_s": args.throttle_s}
+    thread_counts = [int(t) for t in args.threads.split(",") if t.strip()]
+    limiters = [parse_limiter(v) for v in args.limiter.split(",") if v.strip()]
+    queue = build_queue(metadata, args.limit)
+
+    print(f"Link resolution: {len(queue)} tracks, latency {args.latency_ms}ms ± {args.jitter_ms}ms")
+    print(f"{'mode':>8}{'threads':>8}{'limiter':>18}{'tracks/s':>10}{'found':>8}{'calls/trk':>11}"
+          f"{'search/trk':>12}{'search/hit':>12}{'fail':>6}{'429s':>6}{'trips':>6}{'deferred':>9}")
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    catalogue = build_catalogue(metadata)
+    link_results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in modes:
+            for limiter in limiters:
+                for threads in thread_counts:
+                    r = bench_links(queue, threads, limiter, fake_options, workdir, mode, catalogue,
+                                    args.breaker_cooldown)
+                    link_results.append(r)
+                    print(f"{r['mode']:>8}{r['threads']:>8}{r['limiter']:>18}{r['tracks_per_s']:>10.1f}{r['found']:>8}"
+                          f"{r['calls_per_track']:>11.2f}{r['searches_per_track']:>12.2f}"
+                          f"{r['searches_per_resolved']:>12.2f}{r['failures']:>6}{r['throttled']:>6}"
+                          f"{r['breaker_trips']:>6}{r['deferred']:>9}")
+
+    artist_results = []
+    if not args.skip_artists:
+        discography = build_discography(metadata)
+        print(f"\nArtist verification: {len(discography)} artists")
+        print(f"{'threads':>8}{'artists/s':>11}{'verified':>10}{'calls/artist':>14}")
+        for threads in thread_counts:
+            r = bench_artists(discography, threads, fake_options, args.breaker_cooldown)
+            artist_results.append(r)
+            print(f"{r['threads']:>8}{r['artists_per_s']:>11.1f}{r['verified']:>10}{r['calls_per_artist']:>14.2f}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "links": link_results, "artists": artist_results}, f, indent=2)
+        print(f"\nResults saved to: {args.json_out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Channel Catalogue
+=================
+
+Channel-scoped track resolution for artists with a verified YouTube Music
+channel (artists.json).
+
+- Each channel's songs playlist, albums and singles are fetched once
+  (get_artist -> get_playlist / get_album) and cached to channel_cache.json
+- Tracks are then matched locally by normalized title, so an artist's whole
+  catalogue costs a handful of calls instead of one search per track; the full
+  title (with (Live), (Acapella), ...) is tried first, then the title without
+  feat./ft. credits
+- A per-channel lock makes concurrent workers wait for one fetch instead of
+  all fetching the same channel
+- Callers fall back to global search when the artist has no verified channel
+  or the track is not on it
+- With a circuit breaker every call goes through it; a throttled fetch raises
+  Throttled and is retried later instead of marking the channel as failed
+"""
+
+import difflib
+import re
+import threading
+import time
+import unicodedata
+
+from circuit_breaker import Throttled
+from output_formats import load_output, save_output
+
+CACHE_FILE = "channel_cache.json"
+CACHE_VERSION = 1
+MAX_AGE_DAYS = 14
+SAVE_EVERY = 25          # channel fetches between cache saves
+FETCH_RETRIES = 3
+FUZZY_CUTOFF = 0.92
+
+# Only credits are dropped; (Live), [Acapella], (Remix) name a different recording
+_FEATURING = re.compile(r"\s*[\(\[]\s*(?:feat\b\.?|ft\b\.?|featuring\b)[^\)\]]*[\)\]]", re.IGNORECASE)
+
+def normalize_title(text, strip_featuring=False):
+    """Lowercase, strip diacritics and punctuation; bracketed words are kept unless they are a feat. credit."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    if strip_featuring:
+        text = _FEATURING.sub(" ", text)
+    text = re.sub(r"[^\w\s\u0590-\u05FF]", " ", text)
+    return " ".join(text.lower().split())
+
+def load_channel_map(path):
+    """artists.json ({"artists": [{"id", "name"}]}) -> {artist name: channel ID}"""
+    data = load_output(path, default={})
+    return {a["name"]: a["id"] for a in data.get("artists", []) if a.get("name") and a.get("id")}
+
+class ChannelCatalogue:
+    def __init__(self, client, cache_path=CACHE_FILE, max_age_days=MAX_AGE_DAYS, timer=None, on_error=None,
+                 breaker=None):
+        """timer(method) -> context manager timing one client call; on_error(channel_id, method, exc);
+        breaker: CircuitBreaker guarding the client calls."""
+        self.client = client
+        self.cache_path = cache_path
+        self.max_age = max_age_days * 86400
+        self.timer = timer
+        self.on_error = on_error
+        self.breaker = breaker
+        cache = load_output(cache_path, default={}) if cache_path else {}
+        self.channels = cache.get("channels", {}) if cache.get("version") == CACHE_VERSION else {}
+        self.fetches = 0
+        self._indexes = {}
+        self._locks = {}
+        self._failed = set()     # channels that could not be fetched this run
+        self._lock = threading.Lock()
+        self._unsaved = 0
+
+    def _call(self, method, *args, **kwargs):
+        fn = getattr(self.client, method)
+        if self.breaker is not None:
+            args = (fn,) + args
+            fn = self.breaker.call
+        if self.timer is None:
+            return fn(*args, **kwargs)
+        with self.timer(method):
+            return fn(*args, **kwargs)
+
+    def _channel_lock(self, channel_id):
+        with self._lock:
+            lock = self._locks.get(channel_id)
+            if lock is None:
+                lock = self._locks[channel_id] = threading.Lock()
+            return lock
+
+    def _fetch(self, channel_id):
+        """All (title, videoId) pairs on a channel: songs playlist, albums and singles."""
+        tracks = {}
+
+        def add(items):
+            for item in items or []:
+                if item.get("videoId") and item.get("title"):
+                    tracks.setdefault(item["videoId"], item["title"])
+
+        artist = self._call("get_artist", channel_id)
+        songs = artist.get("songs") or {}
+        add(songs.get("results"))
+        if songs.get("browseId"):
+            add(self._call("get_playlist", songs["browseId"], limit=None).get("tracks"))
+
+        for name in ("albums", "singles"):
+            section = artist.get(name) or {}
+            results = section.get("results") or []
+            if section.get("params") and section.get("browseId"):
+                # Only the first few releases are inlined; the full list needs one more call
+                try:
+                    results = self._call("get_artist_albums", section["browseId"], section["params"])
+                except Throttled:
+                    raise
+                except Exception as e:
+                    if self.on_error:
+                        self.on_error(channel_id, "get_artist_albums", e)
+            for album in results:
+                if album.get("browseId"):
+                    # One unavailable release should not cost the whole channel
+                    try:
+                        add(self._call("get_album", album["browseId"]).get("tracks"))
+                    except Throttled:
+                        raise
+                    except Exception as e:
+                        if self.on_error:
+                            self.on_error(channel_id, "get_album", e)
+        return [[title, video_id] for video_id, title in tracks.items()]
+
+    def tracks(self, channel_id):
+        """Cached (title, videoId) list for a channel, fetched once; None if the fetch failed.
+
+        Raises Throttled (without giving up on the channel) if the breaker reports throttling.
+        """
+        entry = self.channels.get(channel_id)
+        if entry and time.time() - entry["fetched_at"] < self.max_age:
+            return entry["tracks"]
+        with self._channel_lock(channel_id):
+            entry = self.channels.get(channel_id)
+            if entry and time.time() - entry["fetched_at"] < self.max_age:
+                return entry["tracks"]
+            if channel_id in self._failed:
+                return None
+            for attempt in range(FETCH_RETRIES):
+                try:
+                    tracks = self._fetch(channel_id)
+                    break
+                except Throttled:
+                    raise
+                except Exception as e:
+                    if self.on_error:
+                        self.on_error(channel_id, "fetch", e)
+                    if attempt < FETCH_RETRIES - 1:
+                        time.sleep(0.5 * 2 ** attempt)
+            else:
+                self._failed.add(channel_id)
+                return None
+            with self._lock:
+                self.channels[channel_id] = {"fetched_at": round(time.time()), "tracks": tracks}
+                self._indexes.pop(channel_id, None)
+                self.fetches += 1
+                self._unsaved += 1
+                save_now = self._unsaved >= SAVE_EVERY
+            if save_now:
+                self.save()
+            return tracks
+
+    def _index(self, channel_id, tracks):
+        """(full title -> videoId, title without feat. credits -> videoId) for a channel."""
+        indexes = self._indexes.get(channel_id)
+        if indexes is None:
+            full, credits_stripped = {}, {}
+            for title, video_id in tracks:
+                full.setdefault(normalize_title(title), video_id)
+                credits_stripped.setdefault(normalize_title(title, strip_featuring=True), video_id)
+            indexes = (full, credits_stripped)
+            with self._lock:
+                self._indexes[channel_id] = indexes
+        return indexes
+
+    def match(self, channel_id, track):
+        """videoId of track on the channel, or None (channel unavailable or track not on it)."""
+        tracks = self.tracks(channel_id)
+        if not tracks:
+            return None
+        full, credits_stripped = self._index(channel_id, tracks)
+        key = normalize_title(track)
+        if not key:
+            return None
+        if key in full:
+            return full[key]
+        key = normalize_title(track, strip_featuring=True)
+        if key in credits_stripped:
+            return credits_stripped[key]
+        close = difflib.get_close_matches(key, credits_stripped.keys(), n=1, cutoff=FUZZY_CUTOFF)
+        return credits_stripped[close[0]] if close else None
+
+    def save(self):
+        if not self.cache_path:
+            return
+        with self._lock:
+            data = {"version": CACHE_VERSION, "channels": dict(self.channels)}
+            self._unsaved = 0
+        save_output(data, self.cache_path, "min")
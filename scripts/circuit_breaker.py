@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker
+===============
+
+Process-wide, thread-safe throttle detection for ytmusicapi calls.
+
+- closed    : calls flow; failures are tracked in a sliding window
+- open      : a 429 / "Too Many Requests" or a burst of errors trips the breaker;
+              every worker blocks in before_call() for the cooldown (which
+              doubles on each consecutive trip, up to max_cooldown)
+- half-open : one probe call at a time; success closes the breaker, failure reopens it,
+              and a probe that ends without a result (Ctrl+C, SystemExit) is
+              released so the next caller can probe
+- after recovery calls are paced (recovery_interval, halved every
+  recovery_streak successes) so workers do not stampede straight back
+
+Callers raise Throttled for items hit by throttling so they can be requeued
+instead of being recorded as misses. Breakers are get-or-create by name, so
+scripts imported together (pipeline.py) share one breaker per upstream.
+"""
+
+import threading
+import time
+from collections import deque
+
+import metrics
+
+THROTTLE_MARKERS = ("429", "too many requests", "rate limit", "ratelimit", "quota", "unusual traffic")
+TRANSIENT_MARKERS = ("expecting value", "json", "timed out", "timeout", "connection", "503", "502", "temporarily")
+
+BREAKER_STATE = metrics.gauge("circuit_breaker_state", "0 closed, 1 half-open, 2 open")
+BREAKER_TRIPS = metrics.counter("circuit_breaker_trips_total", "Times a breaker opened, by reason")
+BREAKER_WAIT_SECONDS = metrics.counter("circuit_breaker_wait_seconds_total", "Time workers spent blocked by a breaker")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class Throttled(Exception):
+    """The call was throttled or failed transiently; requeue the item instead of recording a miss."""
+
+def is_throttle(error):
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or any(marker in str(error).lower() for marker in THROTTLE_MARKERS)
+
+def is_transient(error):
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    name = type(error).__name__.lower()
+    return "timeout" in name or "connection" in name or any(m in str(error).lower() for m in TRANSIENT_MARKERS)
+
+class CircuitBreaker:
+    def __init__(self, name, window=30.0, min_calls=20, error_ratio=0.5, cooldown=15.0, max_cooldown=300.0,
+                 recovery_interval=0.5, recovery_streak=20):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_ratio = error_ratio
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.recovery_interval = recovery_interval
+        self.recovery_streak = recovery_streak
+        self._cond = threading.Condition()
+        self.reset()
+
+    def configure(self, **options):
+        with self._cond:
+            for key, value in options.items():
+                if key == "cooldown":
+                    key = "base_cooldown"
+                if not hasattr(self, key):
+                    raise AttributeError(f"unknown breaker option {key}")
+                setattr(self, key, value)
+            self.cooldown = self.base_cooldown
+
+    def reset(self):
+        with self._cond:
+            self.state = CLOSED
+            self.cooldown = self.base_cooldown
+            self.trips = 0
+            self._calls = deque()        # (timestamp, ok)
+            self._open_until = 0.0
+            self._probing = False
+            self._interval = 0.0
+            self._streak = 0
+            self._next_call = 0.0
+            self._cond.notify_all()
+        BREAKER_STATE.set(0, breaker=self.name)
+
+    def _set_state(self, state):
+        self.state = state
+        BREAKER_STATE.set(_STATE_VALUES[state], breaker=self.name)
+
+    def before_call(self):
+        """Block until this thread may call upstream (paused while open, paced while recovering).
+
+        Returns True if this call is the half-open probe; it must end in
+        record_success(), record_failure() or release_probe().
+        """
+        waited_from = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.state == OPEN:
+                    if now < self._open_until:
+                        self._cond.wait(self._open_until - now)
+                        continue
+                    self._set_state(HALF_OPEN)
+                if self.state == HALF_OPEN:
+                    if self._probing:
+                        self._cond.wait(1.0)
+                        continue
+                    self._probing = True
+                    probe = True
+                    break
+                if self._interval and now < self._next_call:
+                    self._cond.wait(self._next_call - now)
+                    continue
+                self._next_call = now + self._interval
+                probe = False
+                break
+        waited = time.monotonic() - waited_from
+        if waited > 0.001:
+            BREAKER_WAIT_SECONDS.inc(waited, breaker=self.name)
+        return probe
+
+    def release_probe(self):
+        """Give up the half-open probe without a verdict, so another caller can probe."""
+        with self._cond:
+            if self.state == HALF_OPEN and self._probing:
+                self._probing = False
+                self._cond.notify_all()
+
+    def _trip(self, reason):
+        self._open_until = time.monotonic() + self.cooldown
+        self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+        self._probing = False
+        self._calls.clear()
+        self.trips += 1
+        self._set_state(OPEN)
+        BREAKER_TRIPS.inc(breaker=self.name, reason=reason)
+        self._cond.notify_all()
+
+    def _record(self, ok):
+        now = time.monotonic()
+        self._calls.append((now, ok))
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+
+    def record_success(self):
+        with self._cond:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                self.cooldown = self.base_cooldown
+                self._interval = self.recovery_interval
+                self._streak = 0
+                self._set_state(CLOSED)
+                self._cond.notify_all()
+            elif self._interval:
+                self._streak += 1
+                if self._streak >= self.recovery_streak:
+                    self._streak = 0
+                    self._interval = self._interval / 2 if self._interval > 0.01 else 0.0
+            self._record(True)
+
+    def record_failure(self, error):
+        """Count a failed call; returns True if it was throttling (the item should be requeued)."""
+        throttled = is_throttle(error)
+        with self._cond:
+            if self.state == HALF_OPEN:
+                self._trip("probe_failed")
+                return True
+            if self.state == OPEN:
+                return True
+            self._streak = 0
+            self._record(False)
+            if throttled:
+                self._trip("throttled")
+                return True
+            failures = sum(1 for _, ok in self._calls if not ok)
+            if len(self._calls) >= self.min_calls and failures / len(self._calls) >= self.error_ratio:
+                self._trip("error_burst")
+                return True
+        return False
+
+    def call(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs) through the breaker; throttling surfaces as Throttled."""
+        probe = self.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if self.record_failure(e):
+                raise Throttled(str(e)) from e
+            raise
+        except BaseException:
+            # KeyboardInterrupt etc. say nothing about upstream, but must not hold the probe
+            if probe:
+                self.release_probe()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._cond:
+            return {"state": self.state, "trips": self.trips, "cooldown": self.cooldown,
+                    "interval": self._interval, "window_calls": len(self._calls)}
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name, **options):
+    """Get or create the process-wide breaker called name."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **options)
+        return breaker
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Delta Feed
+==========
+
+Change detection between scraper runs, so recrawls only push what changed
+downstream instead of a whole new metadata.json.
+
+- fingerprint(): sha1 over a collection's normalized JSON-LD
+- FingerprintStore: collection_id -> fingerprint + artist, kept between runs
+- build_delta(): added / changed / removed entries for the IDs fetched this run
+  (IDs that errored are left alone; only a 404 counts as removed)
+- merge_delta(): a delta file is a pending feed; each scrape folds its changes
+  into it (one entry per collection) instead of overwriting it
+- DeltaAcks: per consumer, the entry versions it has fully handled; entries are
+  only acked once every track/artist was processed, so capped or throttled work
+  carries over to the next run
+- delta_records() / delta_artists(): what the link fetcher and the verifier consume
+
+A delta file is a list of entries:
+    {"change": "added" | "changed" | "removed", "collection_id": 12,
+     "artist": "...", "previous_artist": "..." | null, "record": {...} | null,
+     "fingerprint": "..." | null, "previous_artists": [...]}
+"""
+
+import hashlib
+import json
+import os
+import unicodedata
+
+from output_formats import COMPRESSIONS, iter_records, load_output, save_output
+
+CHANGES = ("added", "changed", "removed")
+CONSUMERS = ("links", "artists")
+STORE_VERSION = 1
+
+# Fields used when a page had no JSON-LD to fingerprint
+_FALLBACK_FIELDS = ("title", "artist", "publication_date", "duration", "image_url", "tracks")
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFC", value).split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+def fingerprint(record):
+    """Stable content hash of a collection (key order and whitespace do not matter)."""
+    source = record.get("raw_json_ld") or {k: record.get(k) for k in _FALLBACK_FIELDS}
+    canonical = json.dumps(_normalize(source), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+# -----------------------
+# Fingerprint store
+# -----------------------
+class FingerprintStore:
+    """collection_id -> [fingerprint, artist], persisted as one JSON file."""
+
+    def __init__(self, path, collections=None):
+        self.path = path
+        self.collections = collections or {}
+
+    @classmethod
+    def load(cls, path):
+        data = load_output(path, default={})
+        return cls(path, {int(k): v for k, v in data.get("collections", {}).items()})
+
+    def save(self, fmt="pretty"):
+        data = {"version": STORE_VERSION, "collections": {str(k): v for k, v in sorted(self.collections.items())}}
+        save_output(data, self.path, fmt)
+
+    def __len__(self):
+        return len(self.collections)
+
+# -----------------------
+# Delta
+# -----------------------
+def build_delta(results, store):
+    """Compare scrape results against store, update it in place and return the delta entries."""
+    delta = []
+    for result in results:
+        cid = result.get("collection_id")
+        if cid is None:
+            continue
+        previous = store.collections.get(cid)
+        status = result.get("status")
+
+        if status == "success":
+            fp = fingerprint(result)
+            artist = (result.get("artist") or "").strip()
+            store.collections[cid] = [fp, artist]
+            if previous is None:
+                change = "added"
+            elif previous[0] != fp:
+                change = "changed"
+            else:
+                continue
+            delta.append({"change": change, "collection_id": cid, "artist": artist,
+                          "previous_artist": previous[1] if previous else None, "record": result,
+                          "fingerprint": fp})
+        elif status == "404" and previous is not None:
+            del store.collections[cid]
+            delta.append({"change": "removed", "collection_id": cid, "artist": previous[1],
+                          "previous_artist": previous[1], "record": None, "fingerprint": None})
+
+    delta.sort(key=lambda e: e["collection_id"])
+    return delta
+
+def merge_delta(pending, delta):
+    """Fold this run's delta into the still-pending feed, newest entry per collection."""
+    by_id = {e["collection_id"]: e for e in pending}
+    for entry in delta:
+        old = by_id.get(entry["collection_id"])
+        if old is not None:
+            entry = dict(entry)
+            # Consumers that missed the older entry still see the net change
+            if old["change"] == "added" and entry["change"] == "changed":
+                entry["change"] = "added"
+            elif old["change"] == "removed" and entry["change"] == "added":
+                entry["change"] = "changed"
+            # Artists named by the older entry keep their discography re-checked
+            names = list(old.get("previous_artists") or [])
+            for name in (old.get("previous_artist"), old.get("artist"), entry.get("previous_artist")):
+                if name and name != entry.get("artist") and name not in names:
+                    names.append(name)
+            entry["previous_artists"] = names
+        by_id[entry["collection_id"]] = entry
+    return sorted(by_id.values(), key=lambda e: e["collection_id"])
+
+def entry_version(entry):
+    """What a consumer acks: the collection's fingerprint, or "removed"."""
+    return entry.get("fingerprint") or entry["change"]
+
+def summarize(delta):
+    counts = dict.fromkeys(CHANGES, 0)
+    for entry in delta:
+        counts[entry["change"]] += 1
+    return counts
+
+def load_delta(path):
+    return list(iter_records(path))
+
+def delta_records(delta):
+    """Current records of added and changed collections (the tracks that need resolving)."""
+    return [e["record"] for e in delta if e["change"] != "removed" and e.get("record")]
+
+def entry_artists(entry):
+    """Artists whose discography one delta entry touches, old names included."""
+    names = [entry.get("artist"), entry.get("previous_artist")] + list(entry.get("previous_artists") or [])
+    return {name.strip() for name in names if name and name.strip()}
+
+def delta_artists(delta):
+    """Every artist whose discography a delta touches, old names included."""
+    artists = set()
+    for entry in delta:
+        artists |= entry_artists(entry)
+    return artists
+
+# -----------------------
+# Consumer acks
+# -----------------------
+def ack_path(delta_path, consumer):
+    """metadata.delta.json -> metadata.delta.links-ack.json"""
+    root = delta_path
+    for codec in COMPRESSIONS:
+        if root.endswith("." + codec):
+            root = root[:-len(codec) - 1]
+    root = os.path.splitext(root)[0]
+    return f"{root}.{consumer}-ack.json"
+
+class DeltaAcks:
+    """collection_id -> entry version one consumer has fully handled, persisted next to the delta."""
+
+    def __init__(self, path, acked=None):
+        self.path = path
+        self.acked = acked or {}
+
+    @classmethod
+    def load(cls, delta_path, consumer):
+        path = ack_path(delta_path, consumer)
+        return cls(path, {int(k): v for k, v in load_output(path, default={}).items()})
+
+    def is_acked(self, entry):
+        return self.acked.get(entry["collection_id"]) == entry_version(entry)
+
+    def pending(self, delta):
+        """Entries of the feed this consumer has not handled yet."""
+        return [e for e in delta if not self.is_acked(e)]
+
+    def ack(self, entry):
+        self.acked[entry["collection_id"]] = entry_version(entry)
+
+    def save(self):
+        save_output({str(k): v for k, v in sorted(self.acked.items())}, self.path, "min")
@@ -6,17 +6,47 @@ This script fetches YouTube channel IDs for artists using ytmusicapi
 and validates them against known discography from metadata.json.
 
 Only artists with confidence >= 70 are included in the output.
+
+With --delta, only artists touched by a scraper delta feed are re-verified and
+the results are merged into the existing output files. Delta entries are acked
+once all their artists were verified; entries with deferred artists carry over
+to the next run.
+
+With --profile DIR, a cProfile of the verification loop, sampled stacks and
+per-section timings are written to DIR/report.txt.
+
+ytmusicapi calls go through the shared circuit breaker (circuit_breaker.py):
+when YouTube Music throttles, verification pauses and the affected artists
+are requeued instead of being recorded as not found.
 """
 
-import json
+import argparse
 import re
+import sys
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
 from difflib import SequenceMatcher
-from ytmusicapi import YTMusic
-
-# Initialize ytmusicapi
-ytm = YTMusic()
+from ytm_backend import ClientPool
+from output_formats import FORMATS, load_output, save_output, parse_precompress
+import metrics
+import delta_feed
+from metadata_reader import iter_collections
+import profiling
+import progress_log
+from progress_log import log, ProgressLine, StructuredLog
+from circuit_breaker import Throttled, get_breaker
+
+# ytmusicapi client per thread, created on first call (YTM_BACKEND=fake for offline runs, see bench_ytm.py)
+ytm = ClientPool('artists', workers=1)
+breaker = get_breaker('ytmusic')
+
+MAX_REQUEUES = 5  # throttled attempts per artist before it is left for the next run
+PROGRESS_INTERVAL = 10.0  # seconds between progress lines
+
+YTM_CALL_SECONDS = metrics.histogram('ytm_call_seconds', 'ytmusicapi call latency')
+YTM_CALL_ERRORS = metrics.counter('ytm_call_errors_total', 'Failed ytmusicapi calls')
+ARTIST_RESULTS = metrics.counter('artist_results_total', 'Artist verification results')
+SAVE_SECONDS = metrics.histogram('save_seconds', 'Time spent writing output files')
 
 def normalize_text(text):
     """Normalize text for comparison"""
@@ -43,16 +73,12 @@ def extract_artist_discography(metadata_path):
     Returns: dict mapping artist_name -> {albums: [...], tracks: [...]}
     """
     print(f"Loading metadata from {metadata_path}...")
-    with open(metadata_path, 'r', encoding='utf-8') as f:
-        metadata = json.load(f)
 
     # Group by artist
     artist_data = defaultdict(lambda: {'albums': set(), 'tracks': set()})
 
-    for item in metadata:
-        if item.get('status') != 'success':
-            continue
-
+    # Streamed one collection at a time, projected to artist/title/track names
+    for item in iter_collections(metadata_path, fields=('artist', 'title', 'tracks')):
         artist = item.get('artist')
         if not artist:
             continue
@@ -60,13 +86,13 @@ def extract_artist_discography(metadata_path):
         if not artist:
             continue
 
-        album_title = item.get('title', '').strip()
+        album_title = (item.get('title') or '').strip()
         if album_title:
             artist_data[artist]['albums'].add(album_title)
 
         # Add track names
-        for track in item.get('tracks', []):
-            track_name = track.get('name', '').strip()
+        for track in item.get('tracks') or []:
+            track_name = (track.get('name') or '').strip()
             if track_name:
                 artist_data[artist]['tracks'].add(track_name)
 
@@ -83,6 +109,7 @@ def search_artist_ytmusic(artist_name, max_retries=3):
     Search for artist using multiple ytmusicapi strategies
 
     Returns: list of candidate results with channelId
+    Raises: Throttled if the circuit breaker reports throttling
     """
     candidates = []
 
@@ -96,7 +123,8 @@ def search_artist_ytmusic(artist_name, max_retries=3):
     for strategy_idx, strategy in enumerate(strategies):
         for attempt in range(max_retries):
             try:
-                results = strategy()
+                with YTM_CALL_SECONDS.time(method='search', filter='artists'):
+                    results = breaker.call(strategy)
                 if results:
                     for result in results:
                         channel_id = result.get('browseId')
@@ -112,11 +140,15 @@ def search_artist_ytmusic(artist_name, max_retries=3):
                                     'strategy': strategy_idx + 1
                                 })
                     break  # Success, exit retry loop
+            except Throttled:
+                YTM_CALL_ERRORS.inc(method='search')
+                raise
             except Exception as e:
+                YTM_CALL_ERRORS.inc(method='search')
                 if attempt < max_retries - 1:
                     time.sleep(2 ** attempt)  # Exponential backoff
                 else:
-                    print(f"  ⚠️  Search failed for {artist_name}: {e}")
+                    log.debug(f"  ⚠️  Search failed for {artist_name}: {e}")
 
     return candidates
 
@@ -125,12 +157,14 @@ def fetch_channel_uploads(channel_id, limit=50):
     Fetch channel's uploads/albums
 
     Returns: list of video/album titles
+    Raises: Throttled if the circuit breaker reports throttling
     """
     titles = []
 
     try:
         # Get artist info including albums
-        artist_info = ytm.get_artist(channel_id)
+        with YTM_CALL_SECONDS.time(method='get_artist'):
+            artist_info = breaker.call(ytm.get_artist, channel_id)
 
         # Extract album titles
         if artist_info and 'albums' in artist_info:
@@ -156,8 +190,12 @@ def fetch_channel_uploads(channel_id, limit=50):
                 if title:
                     titles.append(title)
 
+    except Throttled:
+        YTM_CALL_ERRORS.inc(method='get_artist')
+        raise
     except Exception as e:
-        print(f"  ⚠️  Could not fetch uploads for {channel_id}: {e}")
+        YTM_CALL_ERRORS.inc(method='get_artist')
+        log.debug(f"  ⚠️  Could not fetch uploads for {channel_id}: {e}")
 
     return titles
 
@@ -231,6 +269,7 @@ def process_artist(artist_name, discography):
     Process single artist: search, validate, score
 
     Returns: dict with channelId and confidence, or None if not found
+    Raises: Throttled if the circuit breaker reports throttling (requeue the artist)
     """
     # Search for candidates
     candidates = search_artist_ytmusic(artist_name)
@@ -270,15 +309,58 @@ def process_artist(artist_name, discography):
 
     return best_candidate
 
-def main():
-    """Main processing loop"""
+def merge_results(existing, new, replaced):
+    """Existing entries minus the replaced artist names, followed by the new entries"""
+    return [entry for entry in existing if entry.get('name') not in replaced] + new
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description='Fetch and verify YouTube channel IDs for artists in metadata.json')
+    parser.add_argument('--metadata', default='metadata.json', help='Scraped metadata (default: metadata.json)')
+    parser.add_argument('--output', default='artists_verified.json', help='Verified artists (default: artists_verified.json)')
+    parser.add_argument('--detailed-output', default='artists_verified_detailed.json',
+                        help='Verified artists with confidence details (default: artists_verified_detailed.json)')
+    parser.add_argument('--format', choices=FORMATS, default='pretty', help='Output format (default: pretty)')
+    parser.add_argument('--precompress', type=parse_precompress, default=(), help='Also write compressed siblings, e.g. gz,br')
+    parser.add_argument('--event-log', default='artists_log.jsonl', help='Structured log of skipped artists (default: artists_log.jsonl)')
+    parser.add_argument('--delta', help='Scraper delta feed; only affected artists are re-verified and merged into --output')
+    progress_log.add_arguments(parser)
+    metrics.add_arguments(parser)
+    profiling.add_arguments(parser)
+    return parser.parse_args()
+
+def run(args):
+    """Verify the artists of one run and save the results"""
+    progress_log.setup_logging(args.verbose)
+    event_log = StructuredLog(args.event_log, truncate=True)
+    progress = ProgressLine(PROGRESS_INTERVAL)
+
     # Paths
-    metadata_path = 'metadata.json'
-    output_path = 'artists_verified.json'
-    detailed_output_path = 'artists_verified_detailed.json'
+    metadata_path = args.metadata
+    output_path = args.output
+    detailed_output_path = args.detailed_output
+
+    affected = None
+    if args.delta:
+        # Checked before the (slow) discography pass
+        try:
+            acks = delta_feed.DeltaAcks.load(args.delta, 'artists')
+            delta = acks.pending(delta_feed.load_delta(args.delta))
+        except FileNotFoundError:
+            print(f"❌ {args.delta} not found!", file=sys.stderr)
+            sys.exit(1)
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot read {args.delta} ({e})", file=sys.stderr)
+            sys.exit(1)
+        affected = delta_feed.delta_artists(delta)
 
     # Extract discography from metadata
-    artist_discography = extract_artist_discography(metadata_path)
+    with profiling.stage('load'):
+        artist_discography = extract_artist_discography(metadata_path)
+
+    if affected is not None:
+        artist_discography = {a: d for a, d in artist_discography.items() if a in affected}
+        print(f"Delta touches {len(affected)} artists ({len(artist_discography)} still in metadata)")
 
     print(f"\nProcessing {len(artist_discography)} artists...")
     print("=" * 60)
@@ -288,16 +370,37 @@ def main():
     results_detailed = []  # Detailed format with confidence scores
     found_count = 0
     skipped_count = 0
-
-    for idx, (artist_name, discography) in enumerate(artist_discography.items(), 1):
-        print(f"\n[{idx}/{len(artist_discography)}] {artist_name}")
-
-        result = process_artist(artist_name, discography)
+    deferred = set()  # artists still throttled after MAX_REQUEUES attempts
+    attempts = defaultdict(int)
+    queue = deque(artist_discography.items())
+    idx = 0
+
+    while queue:
+        artist_name, discography = queue.popleft()
+        log.debug(f"\n[{idx + 1}/{len(artist_discography)}] {artist_name}")
+
+        try:
+            with profiling.stage('verify'), profiling.block('process_artist'):
+                result = process_artist(artist_name, discography)
+        except Throttled as e:
+            # The breaker has already paused; retry the artist after the rest of the queue
+            attempts[artist_name] += 1
+            if attempts[artist_name] <= MAX_REQUEUES:
+                ARTIST_RESULTS.inc(result='requeued')
+                event_log.record('requeued', artist=artist_name, attempt=attempts[artist_name], error=str(e)[:200])
+                queue.append((artist_name, discography))
+            else:
+                deferred.add(artist_name)
+                ARTIST_RESULTS.inc(result='deferred')
+                event_log.record('deferred', artist=artist_name, error=str(e)[:200])
+            continue
+        idx += 1
 
         if result and result['confidence']['total'] >= 70:
             found_count += 1
-            print(f"  ✓ Found: {result['channelName']}")
-            print(f"    Confidence: {result['confidence']['total']}% "
+            ARTIST_RESULTS.inc(result='verified')
+            log.debug(f"  ✓ Found: {result['channelName']}")
+            log.debug(f"    Confidence: {result['confidence']['total']}% "
                   f"(name: {result['confidence']['name_similarity']}%, "
                   f"disco: {result['confidence']['discography_match']}%)")
 
@@ -317,31 +420,65 @@ def main():
             })
         else:
             skipped_count += 1
+            ARTIST_RESULTS.inc(result='low_confidence' if result else 'not_found')
             if result:
-                print(f"  ✗ Skipped (low confidence: {result['confidence']['total']}%)")
+                log.debug(f"  ✗ Skipped (low confidence: {result['confidence']['total']}%)")
+                event_log.record('low_confidence', artist=artist_name, channelId=result['channelId'],
+                                 confidence=result['confidence'])
             else:
-                print(f"  ✗ Skipped (not found)")
+                log.debug(f"  ✗ Skipped (not found)")
+                event_log.record('not_found', artist=artist_name)
+
+        progress.emit(lambda: f"[{idx}/{len(artist_discography)}] ✓{found_count} ✗{skipped_count}")
 
         # Rate limiting
         time.sleep(0.5)
 
     # Save results
+    event_log.close()
+    progress_log.flush_logging()
     print("\n" + "=" * 60)
     print(f"Processing complete!")
     print(f"  Found: {found_count}")
     print(f"  Skipped: {skipped_count}")
-    print(f"  Success rate: {found_count / len(artist_discography) * 100:.1f}%")
+    print(f"  Success rate: {found_count / max(len(artist_discography), 1) * 100:.1f}%")
+    if deferred:
+        print(f"  Deferred (throttled, retried next run): {len(deferred)} (breaker tripped {breaker.trips} times)")
+
+    if affected is not None:
+        # Re-verified (or vanished) artists replace their old entries; everyone else is kept
+        results_simple = merge_results(load_output(output_path, default={}).get('artists', []),
+                                       results_simple, affected - deferred)
+        results_detailed = merge_results(load_output(detailed_output_path, default=[]),
+                                         results_detailed, affected - deferred)
 
     # Save simple format (matches original artists.json structure)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump({'artists': results_simple}, f, indent=2, ensure_ascii=False)
+    with SAVE_SECONDS.time(target='artists'), profiling.block('save'):
+        save_output({'artists': results_simple}, output_path, args.format, args.precompress)
 
-    # Save detailed format (for review)
-    with open(detailed_output_path, 'w', encoding='utf-8') as f:
-        json.dump(results_detailed, f, indent=2, ensure_ascii=False)
+        # Save detailed format (for review)
+        save_output(results_detailed, detailed_output_path, args.format, args.precompress)
 
     print(f"\n✓ Saved {len(results_simple)} verified artists to: {output_path}")
+    if affected is not None:
+        handled = [entry for entry in delta if not delta_feed.entry_artists(entry) & deferred]
+        for entry in handled:
+            acks.ack(entry)
+        acks.save()
+        print(f"📬 Delta: {len(handled)} entries done, {len(delta) - len(handled)} carried over to the next run")
+    print(f"🔌 YTMusic: {ytm.summary()}")
     print(f"✓ Saved detailed version to: {detailed_output_path}")
 
+def main():
+    """Main processing loop"""
+    args = parse_args()
+    finish_metrics = metrics.start_from_args(args)
+    finish_profile = profiling.start_from_args(args)
+    try:
+        run(args)
+    finally:
+        finish_metrics()
+        finish_profile()
+
 if __name__ == '__main__':
     main()
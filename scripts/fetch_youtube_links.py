@@ -4,57 +4,110 @@ YouTube Music Link Fetcher (Final Full ETA + Missing Log)
 =========================================================
 
 - Uses ytmusicapi (no scraping, no API key)
-- Multi-threaded for speed (8 threads)
-- ETA for full job shown on every line
+- Multi-threaded for speed (8 threads), one lazily created client per thread sharing
+  a keep-alive HTTP session sized to the thread count
+- Progress + ETA line every few seconds (every track with -v)
 - Appends to youtube-links-optimized.json (never overwrites)
-- Writes not found songs to not_found.txt
+- Writes not found songs to not_found.txt (buffered), misses/errors to link_log.jsonl
 - Retries transient JSON/parse failures automatically
+- Circuit breaker (circuit_breaker.py): throttling or error bursts pause all workers,
+  affected tracks are requeued instead of being recorded as not found
+- Tracks whose search failed with an error are neither links nor misses: they stay out
+  of the links file and not_found.txt and are searched again next run
 - Cleans nulls and saves progress every 500
+- Output format selectable (pretty/min/jsonl/columnar, optional .gz/.br siblings)
+- Streams metadata.json (only artist/title/track names are kept in memory)
+- --artists artists.json: match tracks of verified artists against their channel's
+  songs/albums/singles (fetched once, cached to channel_cache.json), search as fallback
+- --delta: only resolve tracks from added/changed collections in a scraper delta feed;
+  entries are acked once all their tracks are resolved, the rest carry over to the next run
+- --profile DIR: per-stage cProfile (search workers merged; sampled only on Python 3.12+),
+  sampled stacks, report.txt
 """
 
-import json
-import os
+import argparse
 import sys
 import time
 import random
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from ytmusicapi import YTMusic
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ytm_backend import ClientPool
+from output_formats import FORMATS, load_output, save_output, parse_precompress
+import metrics
+import delta_feed
+from metadata_reader import iter_collections
+import profiling
+from circuit_breaker import Throttled, get_breaker, is_transient
+from channel_catalogue import ChannelCatalogue, load_channel_map, CACHE_FILE as CHANNEL_CACHE
+from progress_log import log, setup_logging, ProgressLine, BufferedLog, StructuredLog
+import progress_log
 
 # -----------------------
 # Configuration
 # -----------------------
 OUTPUT_FILE = "youtube-links-optimized.json"
 NOT_FOUND_LOG = "not_found.txt"
+EVENT_LOG = "link_log.jsonl"
+PROGRESS_INTERVAL = 2.0
 MAX_THREADS = 8
 MAX_TRACKS_PER_RUN = 70000
 BATCH_SAVE = 500
 DELAY_BASE = 0.05
 DELAY_JITTER = (0.02, 0.08)
+OUTPUT_FORMAT = "pretty"
+PRECOMPRESS = ()
+MAX_REQUEUES = 5         # throttled attempts per track before it is deferred to the next run
+
+YTM_CALL_SECONDS = metrics.histogram("ytm_call_seconds", "ytmusicapi call latency")
+YTM_ATTEMPTS = metrics.counter("ytm_search_attempts_total", "Track search attempts by outcome")
+LINK_RESULTS = metrics.counter("link_results_total", "Track resolution results")
+CHANNEL_LOOKUPS = metrics.counter("channel_lookups_total", "Channel-scoped track lookups by result")
+REQUEUES = metrics.counter("link_requeues_total", "Tracks requeued after throttling, by outcome")
+SAVE_SECONDS = metrics.histogram("save_seconds", "Time spent writing output files")
 
 sys.stdout.reconfigure(line_buffering=True)
-ytm = YTMusic()
+ytm = ClientPool("links", workers=MAX_THREADS)  # per-thread clients, YTM_BACKEND=fake for offline runs
+channels = None        # ChannelCatalogue, set by enable_channel_scope()
+channel_ids = {}       # artist name -> verified channel ID
+breaker = get_breaker("ytmusic")  # shared by every ytmusicapi caller in the process
 
 # -----------------------
 # Helpers
 # -----------------------
 def load_json(path):
-    if not os.path.exists(path):
-        return {}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    """Existing links, {} if the file does not exist yet; an unreadable file raises
+    instead of being treated as empty (the next save would overwrite it)."""
+    return load_output(path, default={})
 
 def save_json(data, path):
-    tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    os.replace(tmp, path)
+    with SAVE_SECONDS.time(target="links"), profiling.block("save_links"):
+        save_output(data, path, OUTPUT_FORMAT, PRECOMPRESS)
+
+_miss_log = None
+_event_log = None
+
+def open_logs(truncate=False):
+    """Open the buffered miss/event logs (lazily on first use otherwise)."""
+    global _miss_log, _event_log
+    if _miss_log is None:
+        _miss_log = BufferedLog(NOT_FOUND_LOG, truncate=truncate)
+        _event_log = StructuredLog(EVENT_LOG, truncate=truncate)
+    return _miss_log, _event_log
+
+def close_logs():
+    """Flush and close the miss/event logs (reopened on next use)."""
+    global _miss_log, _event_log
+    if _miss_log is not None:
+        _miss_log.close()
+        _event_log.close()
+        _miss_log = _event_log = None
 
 def log_not_found(artist, track):
-    with open(NOT_FOUND_LOG, "a", encoding="utf-8") as f:
-        f.write(f"{artist} - {track}\n")
+    miss_log, event_log = open_logs()
+    miss_log.write(f"{artist} - {track}")
+    event_log.record("miss", artist=artist, track=track)
+
+def log_event(kind, artist, track, **fields):
+    open_logs()[1].record(kind, artist=artist, track=track, **fields)
 
 def clean_text(text):
     import re, unicodedata
@@ -89,47 +142,243 @@ def format_eta(done, total, start):
 # -----------------------
 # YouTube Music Search
 # -----------------------
+class SearchFailed(Exception):
+    """The search errored; the track is neither found nor missing and is retried next run."""
+
 def search_youtube_music(artist, track, max_retries=3):
+    """videoId of the best match, or None if not found.
+
+    Raises Throttled when the call was throttled (or kept failing transiently)
+    so the caller requeues the track instead of recording a miss, and
+    SearchFailed on any other error.
+    """
     query = f"{artist} {track}"
     for attempt in range(max_retries):
         try:
-            results = ytm.search(query, filter="songs")
+            with YTM_CALL_SECONDS.time(method="search", filter="songs"):
+                results = breaker.call(ytm.search, query, filter="songs")
             if not results:
-                results = ytm.search(query, filter="videos")
-            for item in results or []:
-                title = item.get("title", "")
-                artists = item.get("artists", [])
-                video_id = item.get("videoId")
-                if video_id and validate_match(artist, track, title, artists):
-                    return video_id
-            return None
+                with YTM_CALL_SECONDS.time(method="search", filter="videos"):
+                    results = breaker.call(ytm.search, query, filter="videos")
+        except Throttled as e:
+            YTM_ATTEMPTS.inc(outcome="throttled", attempt=attempt + 1)
+            log.debug(f"⏸ Throttled {artist} - {track}: {e}")
+            raise
         except Exception as e:
             msg = str(e)
-            if "Expecting value" in msg or "JSON" in msg:
-                print(f"⚠️ Retrying ({attempt+1}/{max_retries}) {artist} - {track} (empty response)")
-                time.sleep(0.3 + random.uniform(0, 0.5))
+            if is_transient(e):
+                YTM_ATTEMPTS.inc(outcome="retry", attempt=attempt + 1)
+                log.debug(f"⚠️ Retrying ({attempt+1}/{max_retries}) {artist} - {track} ({msg[:80]})")
+                log_event("retry", artist, track, attempt=attempt + 1, error=msg[:200])
+                time.sleep(0.3 * 2 ** attempt + random.uniform(0, 0.5))
                 continue
-            else:
-                print(f"⚠️ Error searching {artist} - {track}: {e}")
-                return None
-    return None
+            YTM_ATTEMPTS.inc(outcome="error", attempt=attempt + 1)
+            log.debug(f"⚠️ Error searching {artist} - {track}: {e}")
+            log_event("error", artist, track, attempt=attempt + 1, error=msg[:200])
+            raise SearchFailed(msg) from e
+
+        YTM_ATTEMPTS.inc(outcome="ok", attempt=attempt + 1)
+        for item in results or []:
+            title = item.get("title", "")
+            artists = item.get("artists", [])
+            video_id = item.get("videoId")
+            if video_id and validate_match(artist, track, title, artists):
+                return video_id
+        return None
+    # Still failing after retries: not a miss, try again later
+    raise Throttled(f"{max_retries} transient failures")
+
+# -----------------------
+# Channel-scoped resolution
+# -----------------------
+def _channel_error(channel_id, method, error):
+    log.debug(f"⚠️ Channel fetch failed ({method}) {channel_id}: {error}")
+    open_logs()[1].record("channel_error", channelId=channel_id, method=method, error=str(error)[:200])
+
+def enable_channel_scope(artists_file, cache_file=CHANNEL_CACHE):
+    """Resolve tracks of verified artists against their channel catalogue first."""
+    global channels, channel_ids
+    channel_ids = load_channel_map(artists_file)
+    channels = ChannelCatalogue(ytm, cache_file,
+                                timer=lambda method: YTM_CALL_SECONDS.time(method=method),
+                                on_error=_channel_error, breaker=breaker)
+    return len(channel_ids)
+
+def resolve_track_source(artist, track):
+    """(videoId, source): the artist's verified channel first, global search as fallback."""
+    channel_id = channel_ids.get(artist) if channels is not None else None
+    if channel_id:
+        vid = channels.match(channel_id, track)
+        CHANNEL_LOOKUPS.inc(result="hit" if vid else "miss")
+        if vid:
+            return vid, "channel"
+    return search_youtube_music(artist, track), "search"
+
+def resolve_track(artist, track):
+    return resolve_track_source(artist, track)[0]
+
+# -----------------------
+# Resolution
+# -----------------------
+def album_tracks(album):
+    """(artist, track name) pairs of an album that can be searched."""
+    artist = album.get("artist", "")
+    for track in album.get("tracks", []) or []:
+        name = track.get("name", "")
+        if artist and name:
+            yield artist, name
+
+def resolve_tracks(queue, youtube_links, existing, total_tracks, run_limit, start_time):
+    """Search every (artist, track) in queue and record results in youtube_links."""
+    processed = 0
+    found = 0
+    errored = 0
+    requeued = 0
+    deferred = 0
+    progress = ProgressLine(PROGRESS_INTERVAL)
+
+    def render_progress():
+        done = processed + existing
+        elapsed = time.time() - start_time
+        line = (f"[{done}/{total_tracks} | {done / total_tracks * 100:4.1f}% | "
+                f"{processed / elapsed if elapsed > 0 else 0:.1f}/s | ETA {format_eta(done, total_tracks, start_time)}] "
+                f"✓{found} ✗{processed - found}")
+        if errored:
+            line += f" ⚠{errored} errors"
+        if requeued:
+            line += f" ⏸{requeued} requeued"
+        if breaker.state != "closed":
+            line += f" [breaker {breaker.state}]"
+        return line
+
+    if isinstance(ytm, ClientPool):
+        ytm.configure(MAX_THREADS)
+    with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
+        search = profiling.wrap(resolve_track_source, "search")
+        pending = {executor.submit(search, a, t): (a, t) for a, t in queue}
+        attempts = {}
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                artist, track = pending.pop(future)
+                key = f"{artist}|{track}"
+                try:
+                    vid, source = future.result()
+                except Throttled as e:
+                    # Throttled tracks go to the back of the queue; workers already
+                    # wait on the breaker, so this does not hammer the API
+                    attempts[key] = attempts.get(key, 0) + 1
+                    if attempts[key] <= MAX_REQUEUES:
+                        requeued += 1
+                        REQUEUES.inc(outcome="requeued")
+                        log_event("requeue", artist, track, attempt=attempts[key], error=str(e)[:200])
+                        pending[executor.submit(search, artist, track)] = (artist, track)
+                    else:
+                        # Left out of youtube_links, so the next run picks it up again
+                        deferred += 1
+                        REQUEUES.inc(outcome="deferred")
+                        log_event("deferred", artist, track, attempts=attempts[key], error=str(e)[:200])
+                    continue
+                except SearchFailed:
+                    # Already in the event log; not a miss, so the next run searches it again
+                    errored += 1
+                    LINK_RESULTS.inc(result="error")
+                    progress.emit(render_progress)
+                    time.sleep(DELAY_BASE + random.uniform(*DELAY_JITTER))
+                    continue
+
+                if vid:
+                    youtube_links[key] = {
+                        "artist": artist,
+                        "track": track,
+                        "url": f"https://music.youtube.com/watch?v={vid}"
+                    }
+                    found += 1
+                    status = "✓ Found"
+                    LINK_RESULTS.inc(result="found")
+                else:
+                    youtube_links[key] = None
+                    log_not_found(artist, track)
+                    status = "✗ Not found"
+                    LINK_RESULTS.inc(result="not_found")
+
+                processed += 1
+                log.debug(f"[{processed + existing}/{total_tracks}] {status}: {artist} - {track}")
+                progress.emit(render_progress)
+
+                if processed % BATCH_SAVE == 0:
+                    save_json(youtube_links, OUTPUT_FILE)
+                    log.info(f"💾 Saved progress ({processed}/{run_limit})...")
+
+                # Channel matches are local lookups, only searches are paced
+                if source == "search":
+                    time.sleep(DELAY_BASE + random.uniform(*DELAY_JITTER))
+
+    if processed:
+        progress.emit(render_progress, force=True)
+    if requeued or deferred:
+        log.info(f"⏸ Throttling: {requeued} requeues, {deferred} tracks deferred to the next run "
+                 f"({breaker.trips} breaker trips)")
+    if errored:
+        log.info(f"⚠️ {errored} searches failed with an error; those tracks are retried next run (see {EVENT_LOG})")
+    return processed, found
 
 # -----------------------
 # Main
 # -----------------------
-def main():
-    print("Loading metadata.json...")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch YouTube Music links for every track in metadata.json")
+    parser.add_argument("--metadata", default="metadata.json", help="Scraped metadata (default: metadata.json)")
+    parser.add_argument("--output", default=OUTPUT_FILE, help=f"Links file, appended to across runs (default: {OUTPUT_FILE})")
+    parser.add_argument("--format", choices=FORMATS, default=OUTPUT_FORMAT, help=f"Output format (default: {OUTPUT_FORMAT})")
+    parser.add_argument("--precompress", type=parse_precompress, default=PRECOMPRESS, help="Also write compressed siblings, e.g. gz,br")
+    parser.add_argument("--artists", help="Verified artists (e.g. artists.json); their tracks are matched on their channel first")
+    parser.add_argument("--channel-cache", default=CHANNEL_CACHE, help=f"Channel catalogue cache (default: {CHANNEL_CACHE})")
+    parser.add_argument("--delta", help="Scraper delta feed; only tracks of added/changed collections are resolved")
+    progress_log.add_arguments(parser)
+    metrics.add_arguments(parser)
+    profiling.add_arguments(parser)
+    return parser.parse_args()
+
+def run(args):
+    """Resolve the links for one run (metadata or delta) and save them."""
+    setup_logging(args.verbose)
+
+    if args.delta:
+        print(f"Loading delta {args.delta}...")
+        try:
+            acks = delta_feed.DeltaAcks.load(args.delta, "links")
+            delta = acks.pending(delta_feed.load_delta(args.delta))
+        except FileNotFoundError:
+            print(f"❌ {args.delta} not found!", file=sys.stderr)
+            sys.exit(1)
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot read {args.delta} ({e})", file=sys.stderr)
+            sys.exit(1)
+        metadata = delta_feed.delta_records(delta)
+        counts = delta_feed.summarize(delta)
+        print(f"Delta: +{counts['added']} added, ~{counts['changed']} changed, -{counts['removed']} removed")
+    else:
+        print(f"Loading {args.metadata}...")
+        try:
+            # Streamed and projected to artist/title/track names (see metadata_reader.py)
+            with profiling.block("load_metadata"):
+                metadata = list(iter_collections(args.metadata))
+        except FileNotFoundError:
+            print(f"❌ {args.metadata} not found!", file=sys.stderr)
+            sys.exit(1)
+
     try:
-        with open("metadata.json", "r", encoding="utf-8") as f:
-            metadata = json.load(f)
-    except FileNotFoundError:
-        print("❌ metadata.json not found!", file=sys.stderr)
+        youtube_links = load_json(OUTPUT_FILE)
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot read {OUTPUT_FILE} ({e}); refusing to overwrite it", file=sys.stderr)
         sys.exit(1)
-
-    youtube_links = load_json(OUTPUT_FILE)
     total_tracks = sum(len(a.get("tracks", [])) for a in metadata)
     existing = len(youtube_links)
-    remaining = total_tracks - existing
+    # A delta's tracks are counted on their own, not against the whole links file
+    baseline = 0 if args.delta else existing
+    remaining = total_tracks - baseline
 
     run_limit = min(remaining, MAX_TRACKS_PER_RUN)
     print(f"Total tracks: {total_tracks}")
@@ -137,23 +386,19 @@ def main():
     print(f"Remaining NEW tracks: {remaining}")
     print(f"Run cap: {run_limit}\n")
 
-    start_time = time.time()
-    processed = 0
-    found = 0
     queue = []
 
     # Clear not_found log for this run
-    open(NOT_FOUND_LOG, "w").close()
+    open_logs(truncate=True)
+
+    if args.artists:
+        print(f"Channel-scoped resolution for {enable_channel_scope(args.artists, args.channel_cache)} verified artists "
+              f"({len(channels.channels)} channels cached)")
 
     # Build queue
     for album in metadata:
-        artist = album.get("artist", "")
-        for track in album.get("tracks", []) or []:
-            name = track.get("name", "")
-            if not artist or not name:
-                continue
-            key = f"{artist}|{name}"
-            if key in youtube_links:
+        for artist, name in album_tracks(album):
+            if f"{artist}|{name}" in youtube_links:
                 continue
             queue.append((artist, name))
             if len(queue) >= run_limit:
@@ -161,38 +406,17 @@ def main():
         if len(queue) >= run_limit:
             break
 
-    with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-        futures = {executor.submit(search_youtube_music, a, t): (a, t) for a, t in queue}
-
-        for i, future in enumerate(as_completed(futures), 1):
-            artist, track = futures[future]
-            vid = future.result()
-            key = f"{artist}|{track}"
-
-            if vid:
-                youtube_links[key] = {
-                    "artist": artist,
-                    "track": track,
-                    "url": f"https://music.youtube.com/watch?v={vid}"
-                }
-                found += 1
-                status = "✓ Found"
-            else:
-                youtube_links[key] = None
-                log_not_found(artist, track)
-                status = "✗ Not found"
-
-            processed += 1
-            percent = (processed + existing) / total_tracks * 100
-            eta = format_eta(processed + existing, total_tracks, start_time)
-            print(f"[{processed + existing}/{total_tracks} | {percent:4.1f}% | ETA {eta}] {status}: {artist} - {track}")
-            sys.stdout.flush()
-
-            if processed % BATCH_SAVE == 0:
-                save_json(youtube_links, OUTPUT_FILE)
-                print(f"💾 Saved progress ({processed}/{run_limit})...")
-
-            time.sleep(DELAY_BASE + random.uniform(*DELAY_JITTER))
+    start_time = time.time()
+    with profiling.stage("resolve"):
+        processed, found = resolve_tracks(queue, youtube_links, baseline, total_tracks, run_limit, start_time)
+    progress_log.shutdown_logging()
+    close_logs()
+
+    # Not found is recorded as None, so every handled track has a key by now
+    handled = None
+    if args.delta:
+        handled = [e for e in delta if e["change"] == "removed"
+                   or all(f"{a}|{t}" in youtube_links for a, t in album_tracks(e["record"] or {}))]
 
     # Cleanup nulls
     before = len(youtube_links)
@@ -202,12 +426,36 @@ def main():
         print(f"\n🧹 Removed {removed} null entries.")
 
     save_json(youtube_links, OUTPUT_FILE)
+    if handled is not None:
+        for entry in handled:
+            acks.ack(entry)
+        acks.save()
+        print(f"📬 Delta: {len(handled)} entries done, {len(delta) - len(handled)} carried over to the next run "
+              f"(acks in {acks.path})")
+    if channels is not None:
+        channels.save()
+        print(f"📺 Channel lookups: {int(CHANNEL_LOOKUPS.value(result='hit'))} matched, "
+              f"{int(CHANNEL_LOOKUPS.value(result='miss'))} fell back to search "
+              f"({channels.fetches} channels fetched, cache {args.channel_cache})")
+    print(f"🔌 YTMusic: {ytm.summary()}")
 
     elapsed = time.time() - start_time
     m, s = divmod(int(elapsed), 60)
     print(f"\n✓ Done — processed {processed}, found {found}, cleaned {removed}.")
     print(f"Elapsed: {m}m {s}s. Saved to {OUTPUT_FILE}. Missing written to {NOT_FOUND_LOG}")
 
+def main():
+    global OUTPUT_FILE, OUTPUT_FORMAT, PRECOMPRESS
+    args = parse_args()
+    OUTPUT_FILE, OUTPUT_FORMAT, PRECOMPRESS = args.output, args.format, args.precompress
+    finish_metrics = metrics.start_from_args(args)
+    finish_profile = profiling.start_from_args(args)
+    try:
+        run(args)
+    finally:
+        finish_metrics()
+        finish_profile()
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Join YouTube Links into Metadata
+================================
+
+- Attaches the bare YouTube video ID to every track in metadata.json
+- Tracks are addressed by (collection_id, track index), not "artist|track"
+- Artist names are interned into a single table and referenced by index
+- Duplicate collections are collapsed (last occurrence wins)
+- Writes one compact release artifact (catalogue.json) for index.html
+
+Output layout:
+    {
+      "version": 1,
+      "fields": {...},
+      "artists": ["Artist A", "Artist B", ...],
+      "collections": [
+        [collection_id, artist_idx, title, publication_date, image_url,
+         [[track_name, duration, video_id_or_null], ...]],
+        ...
+      ]
+    }
+"""
+
+import argparse
+import json
+import os
+import sys
+from urllib.parse import urlparse, parse_qs
+
+# -----------------------
+# Configuration
+# -----------------------
+METADATA_FILE = "metadata.json"
+LINKS_FILE = "youtube-links-optimized.json"
+OUTPUT_FILE = "catalogue.json"
+CATALOGUE_VERSION = 1
+
+COLLECTION_FIELDS = ["collection_id", "artist", "title", "publication_date", "image_url", "tracks"]
+TRACK_FIELDS = ["name", "duration", "video_id"]
+
+# -----------------------
+# Helpers
+# -----------------------
+def video_id_from_link(link):
+    """Return the bare video ID from a youtube-links entry, or None."""
+    if not link:
+        return None
+    url = link.get("url") if isinstance(link, dict) else link
+    if not url:
+        return None
+    ids = parse_qs(urlparse(url).query).get("v")
+    return ids[0] if ids else None
+
+def dedupe_collections(metadata):
+    """Collapse repeated collection IDs (last wins) and sort by ID."""
+    by_id = {}
+    for album in metadata:
+        if album.get("status", "success") != "success":
+            continue
+        cid = album.get("collection_id")
+        if cid is None:
+            continue
+        by_id[cid] = album
+    return [by_id[cid] for cid in sorted(by_id)]
+
+def build_catalogue(metadata, youtube_links):
+    """Build the joined, artist-interned catalogue structure."""
+    artists = []
+    artist_index = {}
+    collections = []
+    linked = 0
+    total = 0
+
+    for album in dedupe_collections(metadata):
+        artist = album.get("artist") or ""
+        idx = artist_index.get(artist)
+        if idx is None:
+            idx = artist_index[artist] = len(artists)
+            artists.append(artist)
+
+        tracks = []
+        for track in album.get("tracks", []) or []:
+            name = track.get("name") or ""
+            vid = video_id_from_link(youtube_links.get(f"{artist}|{name}")) if artist and name else None
+            tracks.append([name, track.get("duration"), vid])
+            total += 1
+            if vid:
+                linked += 1
+
+        collections.append([
+            album["collection_id"],
+            idx,
+            album.get("title"),
+            album.get("publication_date"),
+            album.get("image_url"),
+            tracks,
+        ])
+
+    catalogue = {
+        "version": CATALOGUE_VERSION,
+        "fields": {"collection": COLLECTION_FIELDS, "track": TRACK_FIELDS},
+        "artists": artists,
+        "collections": collections,
+    }
+    return catalogue, {"collections": len(collections), "artists": len(artists),
+                       "tracks": total, "linked": linked}
+
+def save_catalogue(catalogue, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(catalogue, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+# -----------------------
+# Main
+# -----------------------
+def main():
+    parser = argparse.ArgumentParser(description="Join YouTube video IDs into metadata as a compact catalogue")
+    parser.add_argument("--metadata", default=METADATA_FILE, help=f"Scraped metadata (default: {METADATA_FILE})")
+    parser.add_argument("--links", default=LINKS_FILE, help=f"YouTube links file (default: {LINKS_FILE})")
+    parser.add_argument("--output", default=OUTPUT_FILE, help=f"Output catalogue (default: {OUTPUT_FILE})")
+    args = parser.parse_args()
+
+    try:
+        with open(args.metadata, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ {args.metadata} not found!", file=sys.stderr)
+        sys.exit(1)
+
+    youtube_links = {}
+    if os.path.exists(args.links):
+        with open(args.links, "r", encoding="utf-8") as f:
+            youtube_links = json.load(f)
+    else:
+        print(f"⚠️ {args.links} not found, writing catalogue without video IDs")
+
+    catalogue, stats = build_catalogue(metadata, youtube_links)
+    save_catalogue(catalogue, args.output)
+
+    before = os.path.getsize(args.metadata) + (os.path.getsize(args.links) if os.path.exists(args.links) else 0)
+    after = os.path.getsize(args.output)
+    print(f"✓ Joined {stats['linked']}/{stats['tracks']} tracks across "
+          f"{stats['collections']} collections ({stats['artists']} artists).")
+    print(f"Size: {before / 1024:.0f} KiB → {after / 1024:.0f} KiB. Saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Catalogue Lookup Service
+========================
+
+Small asyncio HTTP service (aiohttp) answering lookups over the pipeline's
+output files, so consumers stop re-reading and scanning the large JSON files.
+
+- Sources: catalogue.json (join_youtube_links.py), or metadata.json joined with
+  youtube-links-optimized.json; artists.json adds verified channel IDs
+- Everything is loaded once into compact in-memory indexes: artist ->
+  collections -> tracks -> videoId, normalized artist/track names,
+  videoId -> tracks and channelId -> artists
+- Source files are polled for changes; a changed snapshot is re-indexed in a
+  worker thread and swapped in whole, requests keep using the old index meanwhile
+- Lookups are dict/bisect operations on the loaded index (well under a
+  millisecond); bench_lookup.py measures sustained QPS over HTTP
+
+Endpoints (JSON, 404 when nothing matches):
+    GET /artists/{name}[?linked=1]      an artist's collections and tracks (exact, then normalized name)
+    GET /artists?prefix=...[&limit=N]   artist names by normalized prefix
+    GET /tracks?name=...[&artist=...]   collections containing a track
+    GET /collections/{id}
+    GET /videos/{video_id}              tracks linked to a video
+    GET /channels/{channel_id}          artists verified on a channel, with their collections
+    GET /stats                          index sizes, source files, reloads
+
+Examples:
+    python lookup_service.py --catalogue catalogue.json --artists artists.json
+    python lookup_service.py --metadata metadata.json --links youtube-links-optimized.json --port 8081
+    curl 'localhost:8080/artists/8th%20Day?linked=1'
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from bisect import bisect_left
+from functools import partial
+
+from aiohttp import web
+
+from channel_catalogue import normalize_title
+from join_youtube_links import LINKS_FILE, METADATA_FILE, video_id_from_link
+from metadata_reader import iter_collections
+from output_formats import load_output
+import metrics
+
+# -----------------------
+# Configuration
+# -----------------------
+HOST = "127.0.0.1"
+PORT = 8080
+ARTISTS_FILE = "artists.json"
+RELOAD_INTERVAL = 2.0
+PREFIX_LIMIT = 20
+
+LOOKUP_SECONDS = metrics.histogram("lookup_seconds", "Lookup request latency by route",
+                                   buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.25))
+INDEX_RELOADS = metrics.counter("lookup_index_reloads_total", "Index (re)loads by result")
+
+def watch_url(video_id):
+    return f"https://music.youtube.com/watch?v={video_id}" if video_id else None
+
+# -----------------------
+# Loading
+# -----------------------
+def load_catalogue_collections(path):
+    """catalogue.json -> {collection_id: (artist, title, [(track, videoId or None)])}"""
+    data = load_output(path)
+    fields = data.get("fields", {})
+    cfields = fields.get("collection", ["collection_id", "artist", "title", "publication_date", "image_url", "tracks"])
+    tfields = fields.get("track", ["name", "duration", "video_id"])
+    c_id, c_artist, c_title, c_tracks = (cfields.index(f) for f in ("collection_id", "artist", "title", "tracks"))
+    t_name, t_vid = tfields.index("name"), tfields.index("video_id")
+    artists = data.get("artists", [])
+
+    collections = {}
+    for row in data.get("collections", []):
+        tracks = [(t[t_name], t[t_vid]) for t in row[c_tracks] or [] if t[t_name]]
+        collections[row[c_id]] = (artists[row[c_artist]], row[c_title], tracks)
+    return collections
+
+def load_joined_collections(metadata_path, links_path):
+    """metadata.json + links file -> {collection_id: (artist, title, [(track, videoId or None)])}"""
+    links = load_output(links_path, default={}) if links_path else {}
+    collections = {}
+    # Repeated collection IDs: the last occurrence wins, as in join_youtube_links.py
+    for album in iter_collections(metadata_path):
+        cid = album.get("collection_id")
+        if cid is None:
+            continue
+        artist = (album.get("artist") or "").strip()
+        tracks = [(t["name"], video_id_from_link(links.get(f"{artist}|{t['name']}")))
+                  for t in album.get("tracks") or []]
+        collections[cid] = (artist, album.get("title"), tracks)
+    return collections
+
+# -----------------------
+# Index
+# -----------------------
+class Index:
+    """Read-only lookup tables built from one snapshot of the source files."""
+
+    def __init__(self, collections, channel_map=()):
+        """collections: {collection_id: (artist, title, [(track, videoId)])}; channel_map: [(channelId, artist)]"""
+        self.artists = []              # artist idx -> name
+        self.artist_ids = {}           # name -> artist idx
+        self.by_normalized = {}        # normalized name -> [artist idx]
+        self.artist_collections = []   # artist idx -> [collection id]
+        self.collections = {}          # collection id -> (artist idx, title, ((track, videoId), ...))
+        self.tracks = {}               # normalized track name -> [(collection id, position)]
+        self.videos = {}               # videoId -> [(collection id, position)]
+        self.channels = {}             # channelId -> [artist idx]
+        self.artist_channels = {}      # artist idx -> [channelId]
+        self.track_count = 0
+        self.linked = 0
+
+        for cid in sorted(collections, key=lambda c: (isinstance(c, str), c)):
+            artist, title, tracks = collections[cid]
+            idx = self._artist(artist or "")
+            tracks = tuple((name, vid or None) for name, vid in tracks)
+            self.collections[cid] = (idx, title, tracks)
+            self.artist_collections[idx].append(cid)
+            for pos, (name, vid) in enumerate(tracks):
+                self.tracks.setdefault(normalize_title(name, strip_featuring=True), []).append((cid, pos))
+                self.track_count += 1
+                if vid:
+                    self.videos.setdefault(vid, []).append((cid, pos))
+                    self.linked += 1
+
+        for channel_id, artist in channel_map:
+            idx = self.artist_ids.get(artist)
+            if idx is None:
+                continue
+            self.channels.setdefault(channel_id, []).append(idx)
+            self.artist_channels.setdefault(idx, []).append(channel_id)
+
+        self.names_sorted = sorted(self.by_normalized)
+
+    def _artist(self, name):
+        idx = self.artist_ids.get(name)
+        if idx is None:
+            idx = self.artist_ids[name] = len(self.artists)
+            self.artists.append(name)
+            self.artist_collections.append([])
+            self.by_normalized.setdefault(normalize_title(name), []).append(idx)
+        return idx
+
+    def _artist_indexes(self, name):
+        idx = self.artist_ids.get(name)
+        if idx is not None:
+            return [idx]
+        return self.by_normalized.get(normalize_title(name), [])
+
+    def collection(self, cid, linked_only=False):
+        entry = self.collections.get(cid)
+        if entry is None:
+            return None
+        idx, title, tracks = entry
+        return {
+            "collection_id": cid,
+            "artist": self.artists[idx],
+            "title": title,
+            "tracks": [{"name": name, "video_id": vid, "url": watch_url(vid)}
+                       for name, vid in tracks if vid or not linked_only],
+        }
+
+    def _track_hit(self, cid, pos):
+        idx, title, tracks = self.collections[cid]
+        name, vid = tracks[pos]
+        return {"collection_id": cid, "collection": title, "artist": self.artists[idx],
+                "track": name, "position": pos + 1, "video_id": vid, "url": watch_url(vid)}
+
+    def artist(self, name, linked_only=False):
+        """All artists matching name (exact, else normalized) with their collections."""
+        matches = []
+        for idx in self._artist_indexes(name):
+            collections = [self.collection(cid, linked_only) for cid in self.artist_collections[idx]]
+            if linked_only:
+                collections = [c for c in collections if c["tracks"]]
+            matches.append({"artist": self.artists[idx], "channel_ids": self.artist_channels.get(idx, []),
+                            "collections": collections})
+        return matches
+
+    def find_artists(self, prefix, limit=PREFIX_LIMIT):
+        """Artist names whose normalized name starts with prefix."""
+        key = normalize_title(prefix)
+        if not key:
+            return []  # "(" or "-" would otherwise match every artist
+        names = []
+        for i in range(bisect_left(self.names_sorted, key), len(self.names_sorted)):
+            normalized = self.names_sorted[i]
+            if not normalized.startswith(key) or len(names) >= limit:
+                break
+            names.extend(self.artists[idx] for idx in self.by_normalized[normalized])
+        return names[:limit]
+
+    def track(self, name, artist=None):
+        """Every (collection, position) holding a track, optionally limited to one artist."""
+        hits = self.tracks.get(normalize_title(name, strip_featuring=True), [])
+        if artist is not None:
+            wanted = set(self._artist_indexes(artist))
+            hits = [(cid, pos) for cid, pos in hits if self.collections[cid][0] in wanted]
+        return [self._track_hit(cid, pos) for cid, pos in hits]
+
+    def video(self, video_id):
+        return [self._track_hit(cid, pos) for cid, pos in self.videos.get(video_id, [])]
+
+    def channel(self, channel_id):
+        return [{"artist": self.artists[idx],
+                 "collections": [{"collection_id": cid, "title": self.collections[cid][1]}
+                                 for cid in self.artist_collections[idx]]}
+                for idx in self.channels.get(channel_id, [])]
+
+    def stats(self):
+        return {"artists": len(self.artists), "collections": len(self.collections), "tracks": self.track_count,
+                "linked": self.linked, "videos": len(self.videos), "channels": len(self.channels)}
+
+def build_index(catalogue=None, metadata=METADATA_FILE, links=LINKS_FILE, artists=ARTISTS_FILE):
+    """Index over catalogue.json, or metadata + links when no catalogue is given."""
+    if catalogue:
+        collections = load_catalogue_collections(catalogue)
+    else:
+        collections = load_joined_collections(metadata, links if links and os.path.exists(links) else None)
+    channel_map = []
+    if artists and os.path.exists(artists):
+        channel_map = [(a["id"], a["name"]) for a in load_output(artists, default={}).get("artists", [])
+                       if a.get("id") and a.get("name")]
+    return Index(collections, channel_map)
+
+# -----------------------
+# Service
+# -----------------------
+class LookupService:
+    """Holds the current Index and swaps in a rebuilt one when a source file changes."""
+
+    def __init__(self, catalogue=None, metadata=METADATA_FILE, links=LINKS_FILE, artists=ARTISTS_FILE,
+                 reload_interval=RELOAD_INTERVAL):
+        self.sources = {"catalogue": catalogue, "metadata": None if catalogue else metadata,
+                        "links": None if catalogue else links, "artists": artists}
+        self.reload_interval = reload_interval
+        self.index = None
+        self.mtimes = {}
+        self.loaded_at = None
+        self.load_seconds = None
+        self.reloads = 0
+        self.last_error = None
+
+    def _mtimes(self):
+        mtimes = {}
+        for path in self.sources.values():
+            if path:
+                try:
+                    mtimes[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    mtimes[path] = None
+        return mtimes
+
+    def load(self):
+        """Build a fresh index from the current files (blocking); the swap is a single assignment."""
+        mtimes = self._mtimes()
+        start = time.perf_counter()
+        index = build_index(**self.sources)
+        self.load_seconds = round(time.perf_counter() - start, 3)
+        self.index, self.mtimes, self.loaded_at = index, mtimes, time.time()
+        return index
+
+    async def watch(self):
+        """Poll source mtimes and rebuild off the event loop when one changes."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            mtimes = self._mtimes()
+            if mtimes == self.mtimes:
+                continue
+            try:
+                await loop.run_in_executor(None, self.load)
+            except Exception as e:
+                # Keep serving the old index; don't retry until the files change again
+                self.mtimes = mtimes
+                self.last_error = f"{type(e).__name__}: {e}"
+                INDEX_RELOADS.inc(result="error")
+                print(f"⚠️ Reload failed, keeping previous index: {self.last_error}", file=sys.stderr)
+                continue
+            self.reloads += 1
+            self.last_error = None
+            INDEX_RELOADS.inc(result="ok")
+            print(f"🔄 Reloaded index in {self.load_seconds}s: {self.index.stats()}")
+
+    def stats(self):
+        return {"index": self.index.stats() if self.index else None, "sources": self.mtimes,
+                "loaded_at": self.loaded_at, "load_seconds": self.load_seconds,
+                "reloads": self.reloads, "last_error": self.last_error}
+
+# -----------------------
+# HTTP
+# -----------------------
+_dumps = partial(json.dumps, ensure_ascii=False, separators=(",", ":"))
+
+def _json(data, status=200):
+    return web.json_response(data, status=status, dumps=_dumps)
+
+def _found(data):
+    return _json(data) if data else _json({"error": "not found"}, status=404)
+
+def _flag(request, name):
+    return request.query.get(name, "").lower() in ("1", "true", "yes")
+
+@web.middleware
+async def timing_middleware(request, handler):
+    start = time.perf_counter()
+    try:
+        return await handler(request)
+    finally:
+        resource = request.match_info.route.resource
+        LOOKUP_SECONDS.observe(time.perf_counter() - start,
+                               route=resource.canonical if resource is not None else "unmatched")
+
+def create_app(service):
+    """aiohttp application serving lookups from service.index."""
+
+    async def get_artist(request):
+        return _found(service.index.artist(request.match_info["name"], _flag(request, "linked")))
+
+    async def find_artists(request):
+        prefix = request.query.get("prefix")
+        if not prefix:
+            return _json({"error": "prefix is required"}, status=400)
+        if not normalize_title(prefix):
+            return _json({"error": "prefix must contain a letter or digit"}, status=400)
+        try:
+            limit = max(1, min(int(request.query.get("limit", PREFIX_LIMIT)), 500))
+        except ValueError:
+            return _json({"error": "limit must be an integer"}, status=400)
+        return _json(service.index.find_artists(prefix, limit))
+
+    async def get_track(request):
+        name = request.query.get("name")
+        if not name:
+            return _json({"error": "name is required"}, status=400)
+        return _found(service.index.track(name, request.query.get("artist")))
+
+    async def get_collection(request):
+        cid = request.match_info["cid"]
+        return _found(service.index.collection(int(cid) if cid.isdigit() else cid, _flag(request, "linked")))
+
+    async def get_video(request):
+        return _found(service.index.video(request.match_info["video_id"]))
+
+    async def get_channel(request):
+        return _found(service.index.channel(request.match_info["channel_id"]))
+
+    async def get_stats(request):
+        return _json(service.stats())
+
+    async def start_watcher(app):
+        app["watcher"] = asyncio.create_task(service.watch())
+
+    async def stop_watcher(app):
+        app["watcher"].cancel()
+
+    app = web.Application(middlewares=[timing_middleware])
+    app.add_routes([
+        web.get("/artists", find_artists),
+        web.get("/artists/{name}", get_artist),
+        web.get("/tracks", get_track),
+        web.get("/collections/{cid}", get_collection),
+        web.get("/videos/{video_id}", get_video),
+        web.get("/channels/{channel_id}", get_channel),
+        web.get("/stats", get_stats),
+    ])
+    if service.reload_interval > 0:
+        app.on_startup.append(start_watcher)
+        app.on_cleanup.append(stop_watcher)
+    return app
+
+# -----------------------
+# Main
+# -----------------------
+def main():
+    parser = argparse.ArgumentParser(description="Serve artist/collection/track/video lookups from the pipeline's output files")
+    parser.add_argument("--catalogue", help="Joined catalogue (catalogue.json); replaces --metadata/--links")
+    parser.add_argument("--metadata", default=METADATA_FILE, help=f"Scraped metadata (default: {METADATA_FILE})")
+    parser.add_argument("--links", default=LINKS_FILE, help=f"YouTube links file (default: {LINKS_FILE})")
+    parser.add_argument("--artists", default=ARTISTS_FILE, help=f"Verified artists with channel IDs (default: {ARTISTS_FILE})")
+    parser.add_argument("--host", default=HOST, help=f"Bind address (default: {HOST})")
+    parser.add_argument("--port", type=int, default=PORT, help=f"Port (default: {PORT})")
+    parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL,
+                        help=f"Seconds between source file checks, 0 disables hot reload (default: {RELOAD_INTERVAL})")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    source = args.catalogue or args.metadata
+    if not os.path.exists(source):
+        print(f"❌ {source} not found!", file=sys.stderr)
+        sys.exit(1)
+
+    finish_metrics = metrics.start_from_args(args)
+    service = LookupService(args.catalogue, args.metadata, args.links, args.artists, args.reload_interval)
+    print(f"Loading {source}...")
+    service.load()
+    print(f"✓ Indexed in {service.load_seconds}s: {service.index.stats()}")
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        web.run_app(create_app(service), host=args.host, port=args.port, print=None)
+    finally:
+        finish_metrics()
+
+if __name__ == "__main__":
+    main()
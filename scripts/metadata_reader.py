@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Metadata Reader
+===============
+
+Streaming, projected access to the scraper's metadata.json for the link
+resolver and the verifier, which only need artist, title and track names.
+
+- iter_collections(): successful collections one at a time, reduced to the
+  requested fields (tracks reduced to their names); raw_json_ld and the rest
+  of each record are dropped as soon as it has been parsed
+- A projected JSONL sidecar (metadata.json -> metadata.slim.jsonl) is written
+  during the first full pass and reused while it is newer than the source, so
+  later startups read a file sized by track names rather than by the scrape;
+  concurrent readers (e.g. the pipeline's resolver and verifier) each write
+  their own temp file, and the last complete pass wins the rename
+
+Peak memory is one raw record plus whatever the caller keeps.
+"""
+
+import os
+
+from output_formats import RecordWriter, iter_records
+
+DEFAULT_FIELDS = ("collection_id", "artist", "title", "tracks")
+SIDECAR_FIELDS = DEFAULT_FIELDS
+SIDECAR_SUFFIX = ".slim.jsonl"
+
+def sidecar_path(path):
+    """metadata.json(.gz) -> metadata.slim.jsonl"""
+    base = path
+    for codec in (".gz", ".br"):
+        if base.endswith(codec):
+            base = base[:-len(codec)]
+    return os.path.splitext(base)[0] + SIDECAR_SUFFIX
+
+def project(record, fields=DEFAULT_FIELDS):
+    """Keep only fields; tracks keep only their names."""
+    out = {}
+    for field in fields:
+        value = record.get(field)
+        if field == "tracks":
+            value = [{"name": t.get("name")} for t in value or [] if t.get("name")]
+        out[field] = value
+    return out
+
+def _sidecar_fresh(path, sidecar):
+    try:
+        return os.path.getmtime(sidecar) >= os.path.getmtime(path)
+    except OSError:
+        return False
+
+def iter_collections(path, fields=DEFAULT_FIELDS, use_sidecar=True):
+    """Yield successful collections from a scrape output, projected to fields.
+
+    Raises FileNotFoundError if path does not exist (a stale sidecar alone is not used).
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+
+    sidecar = sidecar_path(path)
+    can_use_sidecar = use_sidecar and set(fields) <= set(SIDECAR_FIELDS)
+    if can_use_sidecar and _sidecar_fresh(path, sidecar):
+        for record in iter_records(sidecar):
+            yield project(record, fields) if tuple(fields) != SIDECAR_FIELDS else record
+        return
+
+    if not can_use_sidecar or not os.access(os.path.dirname(os.path.abspath(sidecar)), os.W_OK):
+        for record in iter_records(path):
+            if record.get("status", "success") == "success":
+                yield project(record, fields)
+        return
+
+    # Full pass over the source; the sidecar only replaces an old one if the pass completes
+    with RecordWriter(sidecar, "jsonl") as writer:
+        for record in iter_records(path):
+            if record.get("status", "success") != "success":
+                continue
+            slim = project(record, SIDECAR_FIELDS)
+            writer.write(slim)
+            yield project(slim, fields) if tuple(fields) != SIDECAR_FIELDS else slim
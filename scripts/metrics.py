@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Metrics
+=======
+
+Small dependency-free metrics surface shared by all scripts.
+
+- Counter / Gauge / Histogram with optional labels, thread-safe
+- Prometheus text exposition on --metrics-port (GET /metrics, /metrics.json)
+- Periodic JSON snapshots to --metrics-file every --metrics-interval seconds
+
+Metrics are get-or-create by name, so modules imported together (e.g. by
+pipeline.py) share the same series.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+    return "{" + body + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# -----------------------
+# Metric types
+# -----------------------
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, v) for key, v in self._values.items()]
+
+    def snapshot(self):
+        with self._lock:
+            return {_format_labels(key) or "": v for key, v in self._values.items()}
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the with-block. Labels may be updated inside it."""
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _quantile(self, counts, total, q):
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for bound, n in zip(self.buckets, counts):
+            seen += n
+            if seen >= rank:
+                return bound if bound != math.inf else self.buckets[-2]
+        return self.buckets[-2]
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, s in self._series.items():
+                cumulative = 0
+                for bound, n in zip(self.buckets, s["counts"]):
+                    cumulative += n
+                    out.append((self.name + "_bucket", key + (("le", _format_value(bound)),), cumulative))
+                out.append((self.name + "_sum", key, s["sum"]))
+                out.append((self.name + "_count", key, s["count"]))
+        return out
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                _format_labels(key) or "": {
+                    "count": s["count"],
+                    "sum": round(s["sum"], 6),
+                    "p50": self._quantile(s["counts"], s["count"], 0.50),
+                    "p99": self._quantile(s["counts"], s["count"], 0.99),
+                }
+                for key, s in self._series.items()
+            }
+
+# -----------------------
+# Registry
+# -----------------------
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"metric {name} already registered as {metric.type}")
+            return metric
+
+    def counter(self, name, help):
+        return self._get_or_create(Counter, name, help)
+
+    def gauge(self, name, help):
+        return self._get_or_create(Gauge, name, help)
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help, buckets=buckets)
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {"timestamp": time.time(), "metrics": {m.name: m.snapshot() for m in metrics}}
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+# -----------------------
+# Export
+# -----------------------
+def write_snapshot(path, registry=REGISTRY):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(registry.snapshot(), f, indent=2)
+    os.replace(tmp, path)
+
+def start_http_server(port, host="127.0.0.1", registry=REGISTRY):
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body = json.dumps(registry.snapshot()).encode("utf-8")
+                ctype = "application/json"
+            elif self.path.startswith("/metrics"):
+                body = registry.render_prometheus().encode("utf-8")
+                ctype = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def start_snapshot_writer(path, interval=15.0, registry=REGISTRY):
+    """Write a JSON snapshot to path every interval seconds from a daemon thread."""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            write_snapshot(path, registry)
+
+    threading.Thread(target=loop, name="metrics-snapshot", daemon=True).start()
+    return stop
+
+def add_arguments(parser):
+    group = parser.add_argument_group("metrics")
+    group.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port (GET /metrics)")
+    group.add_argument("--metrics-file", help="Write periodic JSON metric snapshots to this file")
+    group.add_argument("--metrics-interval", type=float, default=15.0, help="Snapshot interval in seconds (default: 15)")
+
+def start_from_args(args):
+    """Start whichever exporters were requested; returns a callable for the final flush."""
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+        print(f"Metrics: http://127.0.0.1:{args.metrics_port}/metrics")
+    if args.metrics_file:
+        start_snapshot_writer(args.metrics_file, args.metrics_interval)
+
+    def finish():
+        if args.metrics_file:
+            write_snapshot(args.metrics_file)
+    return finish
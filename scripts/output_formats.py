@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Output Formats
+==============
+
+Shared writer/loader for every JSON file the scripts generate.
+
+- pretty   : indented JSON (the historical default)
+- min      : minified JSON (no whitespace)
+- jsonl    : a format header line, then one record per line; dicts are
+             written as [key, value] pairs
+- columnar : column-oriented JSON object (keys stored once per column)
+
+Any format can additionally be precompressed into .gz / .br siblings for
+static hosting. load_output() reads every variant back; the format is taken
+from the file's content (jsonl header / columnar marker), not its name, so
+--format jsonl written to metadata.json still round-trips.
+
+For record lists too large to hold twice in memory, iter_records() streams
+records one at a time and RecordWriter writes them incrementally.
+
+Run directly to compare sizes and parse times for an existing file:
+    python output_formats.py compare metadata.json
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import brotli
+except ImportError:  # optional, only needed for .br siblings
+    brotli = None
+
+FORMATS = ("pretty", "min", "jsonl", "columnar")
+COMPRESSIONS = ("gz", "br")
+DEFAULT_FORMAT = "pretty"
+
+_COLUMNAR_MAGIC = "ytmusicjson-columnar"
+_JSONL_MAGIC = "ytmusicjson-jsonl"
+# Both markers are the first key of the first line, so a short prefix identifies the format
+_COLUMNAR_PREFIX = '{"magic":"%s"' % _COLUMNAR_MAGIC
+_JSONL_PREFIX = '{"format":"%s"' % _JSONL_MAGIC
+_SNIFF_CHARS = 64
+_COMPACT = (",", ":")
+
+# -----------------------
+# Encoding
+# -----------------------
+def _to_columns(data):
+    """Turn a list of dicts (or a dict) into a column-oriented structure."""
+    if isinstance(data, dict):
+        return {"magic": _COLUMNAR_MAGIC, "kind": "dict",
+                "keys": list(data.keys()), "values": list(data.values())}
+
+    columns = []
+    seen = set()
+    for record in data:
+        for key in record:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+
+    values = {c: [] for c in columns}
+    missing = {c: [] for c in columns}
+    for row, record in enumerate(data):
+        for c in columns:
+            if c in record:
+                values[c].append(record[c])
+            else:
+                values[c].append(None)
+                missing[c].append(row)
+
+    return {"magic": _COLUMNAR_MAGIC, "kind": "list", "rows": len(data),
+            "columns": columns, "values": values,
+            "missing": {c: rows for c, rows in missing.items() if rows}}
+
+def _from_columns(obj):
+    if obj.get("magic") != _COLUMNAR_MAGIC:
+        raise ValueError("not a columnar output file")
+    if obj["kind"] == "dict":
+        return dict(zip(obj["keys"], obj["values"]))
+
+    columns = obj["columns"]
+    values = obj["values"]
+    missing = {c: set(rows) for c, rows in obj.get("missing", {}).items()}
+    records = []
+    for row in range(obj["rows"]):
+        record = {}
+        for c in columns:
+            if row in missing.get(c, ()):
+                continue
+            record[c] = values[c][row]
+        records.append(record)
+    return records
+
+def encode(data, fmt=DEFAULT_FORMAT):
+    """Serialize data to bytes in the given format."""
+    if fmt == "pretty":
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    if fmt == "min":
+        return json.dumps(data, ensure_ascii=False, separators=_COMPACT).encode("utf-8")
+    if fmt == "jsonl":
+        kind = "dict" if isinstance(data, dict) else "list"
+        items = data.items() if kind == "dict" else data
+        lines = [_jsonl_header(kind)]
+        lines += (json.dumps(list(item) if kind == "dict" else item, ensure_ascii=False, separators=_COMPACT)
+                  for item in items)
+        return "".join(line + "\n" for line in lines).encode("utf-8")
+    if fmt == "columnar":
+        return json.dumps(_to_columns(data), ensure_ascii=False, separators=_COMPACT).encode("utf-8")
+    raise ValueError(f"unknown output format: {fmt}")
+
+def _jsonl_header(kind):
+    return json.dumps({"format": _JSONL_MAGIC, "kind": kind}, separators=_COMPACT)
+
+def _is_jsonl_header(row):
+    return isinstance(row, dict) and row.get("format") == _JSONL_MAGIC
+
+def decode(raw, fmt):
+    """Inverse of encode()."""
+    if fmt in ("pretty", "min"):
+        return json.loads(raw)
+    if fmt == "jsonl":
+        rows = [json.loads(line) for line in raw.decode("utf-8").splitlines() if line.strip()]
+        if rows and _is_jsonl_header(rows[0]):
+            return dict(rows[1:]) if rows[0].get("kind") == "dict" else rows[1:]
+        # Headerless JSONL: dicts were written as [key, value] pairs, collection records are objects
+        if rows and all(isinstance(r, list) and len(r) == 2 and isinstance(r[0], str) for r in rows):
+            return dict(rows)
+        return rows
+    if fmt == "columnar":
+        return _from_columns(json.loads(raw))
+    raise ValueError(f"unknown output format: {fmt}")
+
+def compress(raw, codec):
+    if codec == "gz":
+        return gzip.compress(raw, compresslevel=9, mtime=0)
+    if codec == "br":
+        if brotli is None:
+            raise RuntimeError("brotli is not installed (pip install brotli)")
+        return brotli.compress(raw, quality=11)
+    raise ValueError(f"unknown compression: {codec}")
+
+def decompress(raw, codec):
+    if codec == "gz":
+        return gzip.decompress(raw)
+    if codec == "br":
+        if brotli is None:
+            raise RuntimeError("brotli is not installed (pip install brotli)")
+        return brotli.decompress(raw)
+    raise ValueError(f"unknown compression: {codec}")
+
+# -----------------------
+# Files
+# -----------------------
+# mkstemp files are 0600; finished outputs get the usual umask-derived mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _mkstemp(path):
+    """(fd, temp path) unique to this writer, in path's directory so the rename stays atomic."""
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                               dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        os.fchmod(fd, 0o666 & ~_UMASK)
+    except (AttributeError, OSError):  # no fchmod on Windows
+        pass
+    return fd, tmp
+
+def _write_atomic(raw, path):
+    fd, tmp = _mkstemp(path)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+        # Atomic rename - if interrupted, old file remains intact
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def parse_precompress(value):
+    """Parse a --precompress argument like "gz,br" into a tuple of codecs."""
+    if not value:
+        return ()
+    codecs = tuple(c.strip() for c in value.split(",") if c.strip())
+    for codec in codecs:
+        if codec not in COMPRESSIONS:
+            raise argparse.ArgumentTypeError(f"unknown compression '{codec}' (choose from {', '.join(COMPRESSIONS)})")
+    return codecs
+
+def save_output(data, path, fmt=DEFAULT_FORMAT, precompress=()):
+    """Write data to path atomically, plus optional .gz/.br siblings."""
+    raw = encode(data, fmt)
+    _write_atomic(raw, path)
+    for codec in precompress:
+        if codec == "br" and brotli is None:
+            print(f"⚠️ brotli not installed, skipping {path}.br", file=sys.stderr)
+            continue
+        _write_atomic(compress(raw, codec), f"{path}.{codec}")
+    return len(raw)
+
+def sniff_format(head, path=""):
+    """Format of a file from its first characters; the extension only decides for headerless JSONL."""
+    head = head.lstrip()
+    if head.startswith(_JSONL_PREFIX):
+        return "jsonl"
+    if head.startswith(_COLUMNAR_PREFIX):
+        return "columnar"
+    if path.endswith(".jsonl"):
+        return "jsonl"
+    return "min"  # pretty and min parse identically
+
+def _split_codec(path):
+    """path -> (path without a .gz/.br suffix, codec or None)"""
+    for c in COMPRESSIONS:
+        if path.endswith("." + c):
+            return path[: -len(c) - 1], c
+    return path, None
+
+def _check_not_pickle(path, head):
+    # Earlier releases pickled columnar files; unpickling runs code from the file, so refuse it
+    if head[:1] == b"\x80":
+        raise ValueError(f"{path} is a legacy pickled columnar file; pickle is no longer loaded, "
+                         f"re-export it from its source")
+
+def detect_format(path):
+    """Return (fmt, codec) for an existing file: codec from its extension, format from its content."""
+    base, codec = _split_codec(path)
+    with open(path, "rb") as f:
+        head = f.read() if codec == "br" else f.read(_SNIFF_CHARS * 4)
+    if codec == "gz":
+        with gzip.open(path, "rb") as f:
+            head = f.read(_SNIFF_CHARS * 4)
+    elif codec == "br":
+        head = decompress(head, codec)[:_SNIFF_CHARS * 4]
+    _check_not_pickle(path, head)
+    return sniff_format(head.decode("utf-8", errors="replace"), base), codec
+
+def load_output(path, default=None):
+    """Load any file written by save_output(); returns default if missing.
+
+    Unreadable or corrupt files raise instead of returning default, so callers
+    never mistake them for empty and overwrite them.
+    """
+    if not os.path.exists(path):
+        return default
+    base, codec = _split_codec(path)
+    with open(path, "rb") as f:
+        raw = f.read()
+    if codec:
+        raw = decompress(raw, codec)
+    _check_not_pickle(path, raw)
+    return decode(raw, sniff_format(raw[:_SNIFF_CHARS * 4].decode("utf-8", errors="replace"), base))
+
+# -----------------------
+# Streaming
+# -----------------------
+def _open_text(path, codec):
+    if codec == "gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """Yield the elements of a top-level JSON array from a text stream, one at a time."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    fill()
+    skip(" \t\r\n")
+    if pos >= len(buf) or buf[pos] != "[":
+        raise ValueError("expected a JSON array")
+    pos += 1
+
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buf):
+            raise ValueError("unterminated JSON array")
+        if buf[pos] == "]":
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # A number cut at the buffer edge ("12|345", "1.|5", "1e|3") decodes
+                # short; only accept it once a delimiter follows it
+                if eof or not isinstance(item, (int, float)) or (
+                        end < len(buf) and buf[end] not in _NUMBER_CHARS):
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+        pos = end
+        yield item
+
+def iter_records(path):
+    """Stream the records of a list-shaped output file without loading it whole.
+
+    JSON arrays and JSONL (optionally .gz) are streamed; other variants are
+    loaded and then iterated.
+    """
+    fmt, codec = detect_format(path)
+    if codec == "br" or fmt == "columnar":
+        yield from load_output(path, default=[])
+        return
+    with _open_text(path, codec) as f:
+        if fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    if not _is_jsonl_header(row):
+                        yield row
+        else:
+            yield from iter_json_array(f)
+
+class RecordWriter:
+    """Write a list of records incrementally; the file appears atomically on close."""
+
+    def __init__(self, path, fmt=DEFAULT_FORMAT):
+        if fmt not in ("pretty", "min", "jsonl"):
+            raise ValueError(f"format {fmt} cannot be streamed")
+        self.path = path
+        self.fmt = fmt
+        self.count = 0
+        self._tmp = None
+        self._f = None
+
+    def __enter__(self):
+        fd, self._tmp = _mkstemp(self.path)
+        self._f = os.fdopen(fd, "w", encoding="utf-8")
+        if self.fmt == "jsonl":
+            self._f.write(_jsonl_header("list") + "\n")
+        else:
+            self._f.write("[")
+        return self
+
+    def write(self, record):
+        if self.fmt == "jsonl":
+            self._f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        elif self.fmt == "min":
+            self._f.write(("," if self.count else "") + json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        else:
+            # Same bytes as json.dump(records, indent=2) would produce
+            body = json.dumps(record, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+            self._f.write(("," if self.count else "") + "\n  " + body)
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.fmt != "jsonl":
+            self._f.write("\n]" if self.count and self.fmt == "pretty" else "]")
+        self._f.close()
+        if exc_type is None:
+            os.replace(self._tmp, self.path)
+        else:
+            os.remove(self._tmp)
+        return False
+
+# -----------------------
+# Comparison
+# -----------------------
+def compare_formats(data, repeat=3):
+    """Return a list of {variant, bytes, encode_s, parse_s} rows."""
+    rows = []
+    for fmt in FORMATS:
+        variants = [(fmt, None)] + [(fmt, c) for c in COMPRESSIONS if c != "br" or brotli is not None]
+        for fmt_, codec in variants:
+            t0 = time.perf_counter()
+            raw = encode(data, fmt_)
+            if codec:
+                raw = compress(raw, codec)
+            encode_s = time.perf_counter() - t0
+
+            best = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                decode(decompress(raw, codec) if codec else raw, fmt_)
+                best = min(best, time.perf_counter() - t0)
+
+            rows.append({"variant": fmt_ + (f".{codec}" if codec else ""),
+                         "bytes": len(raw), "encode_s": encode_s, "parse_s": best})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Output format utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmp_parser = sub.add_parser("compare", help="Compare size and parse time across formats")
+    cmp_parser.add_argument("path", help="Any file readable by load_output()")
+    cmp_parser.add_argument("--repeat", type=int, default=3, help="Parse repetitions (best is reported)")
+    conv_parser = sub.add_parser("convert", help="Rewrite a file in another format")
+    conv_parser.add_argument("src")
+    conv_parser.add_argument("dst")
+    conv_parser.add_argument("--format", choices=FORMATS, default="min")
+    conv_parser.add_argument("--precompress", type=parse_precompress, default=(), help="Comma list: gz,br")
+    args = parser.parse_args()
+
+    data = load_output(args.path if args.command == "compare" else args.src)
+    if data is None:
+        print("❌ input file not found!", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "convert":
+        size = save_output(data, args.dst, args.format, args.precompress)
+        print(f"✓ Wrote {args.dst} ({size / 1024:.0f} KiB, {args.format})")
+        return
+
+    rows = compare_formats(data, args.repeat)
+    baseline = rows[0]["bytes"]
+    print(f"{'variant':<16}{'size':>12}{'ratio':>8}{'encode':>10}{'parse':>10}")
+    for r in rows:
+        print(f"{r['variant']:<16}{r['bytes'] / 1024:>10.0f}Ki{r['bytes'] / baseline:>8.2f}"
+              f"{r['encode_s'] * 1000:>8.1f}ms{r['parse_s'] * 1000:>8.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Streaming Pipeline Runner (scrape → link → verify)
+==================================================
+
+- Runs the 24six scraper and hands every new collection downstream as it arrives
+- Link stage resolves each track with fetch_youtube_links.resolve_track
+  (verified artist's channel catalogue first with --artists, then search)
+- Artist stage verifies each newly seen artist with fetch_artist_ids_verified
+- Stages are connected by bounded queues (backpressure slows the scraper
+  instead of buffering the whole scrape in memory)
+- Each ytmusicapi stage has its own thread pool (--link-workers / --artist-workers)
+- Reports per-release latency: scrape result → last track resolved
+- Both ytmusicapi stages share one circuit breaker; throttled items are retried
+  once it recovers and, if still throttled, left for the next run instead of
+  being recorded as misses; tracks whose search errored are left for the next
+  run as well
+
+Artists are first verified against the discography seen so far (usually their
+first collection). An artist that did not verify is checked again each time its
+collection count doubles, and once more after the scrape if it grew since its
+last check; artists already present in the verified output are skipped.
+File writes run on a single I/O thread, off the event loop.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "246_scrape"))
+
+import scrape_24six_metadata as scraper
+import fetch_youtube_links as links
+import fetch_artist_ids_verified as verifier
+from output_formats import FORMATS, load_output, save_output, parse_precompress
+import metrics
+import progress_log
+from circuit_breaker import Throttled
+from progress_log import log, ProgressLine
+
+# -----------------------
+# Configuration
+# -----------------------
+LINK_WORKERS = links.MAX_THREADS
+ARTIST_WORKERS = 2
+QUEUE_SIZE = 1000
+LINKS_SAVE_EVERY = links.BATCH_SAVE
+ARTISTS_OUTPUT = "artists_verified.json"
+CONFIDENCE_THRESHOLD = 70
+MAX_REQUEUES = 5         # throttled retries per item before it is left for the next run
+PROGRESS_INTERVAL = 2.0  # seconds between progress lines
+
+_DONE = object()
+
+QUEUE_DEPTH = metrics.gauge("pipeline_queue_depth", "Items waiting in each pipeline stage queue")
+RELEASE_SECONDS = metrics.histogram("pipeline_release_seconds", "Scrape result to last track linked",
+                                    buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600))
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+# -----------------------
+# Pipeline
+# -----------------------
+class Pipeline:
+    def __init__(self, link_workers, artist_workers, queue_size, youtube_links, verified,
+                 links_file, artists_file, fmt, precompress=()):
+        self.link_workers = link_workers
+        self.artist_workers = artist_workers
+        self.link_queue = asyncio.Queue(maxsize=queue_size)
+        self.artist_queue = asyncio.Queue(maxsize=queue_size)
+        self.link_pool = ThreadPoolExecutor(max_workers=link_workers, thread_name_prefix="link")
+        self.artist_pool = ThreadPoolExecutor(max_workers=artist_workers, thread_name_prefix="artist")
+        # One thread keeps file writes ordered and off the event loop
+        self.io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="io")
+
+        self.links_file = links_file
+        self.artists_file = artists_file
+        self.fmt = fmt
+        self.precompress = precompress
+        self.youtube_links = youtube_links
+        self.verified = verified
+        self.seen_artists = {a["name"] for a in self.verified}   # verified, never checked again
+        self.discography = defaultdict(lambda: {"albums": [], "tracks": []})
+        self.checked_with = {}       # artist -> collections seen when it was last checked
+        self.queued_artists = set()  # artists waiting in artist_queue
+
+        self.pending = {}
+        self.first_seen = {}
+        self.release_latency = []
+        self.progress = ProgressLine(PROGRESS_INTERVAL)
+        self.counters = {"collections": 0, "tracks": 0, "found": 0, "not_found": 0,
+                         "cached": 0, "artists_checked": 0, "artists_verified": 0,
+                         "errored": 0, "requeued": 0, "deferred": 0}
+
+    # Scraper callback: runs inside the scrape's task, so put() applies backpressure
+    async def on_collection(self, metadata):
+        if metadata.get("status") != "success":
+            return
+        cid = metadata["collection_id"]
+        artist = (metadata.get("artist") or "").strip()
+        tracks = [t.get("name") for t in metadata.get("tracks") or [] if t.get("name")]
+        self.counters["collections"] += 1
+
+        if artist and tracks:
+            self.pending[cid] = len(tracks)
+            self.first_seen[cid] = time.time()
+            for name in tracks:
+                await self.link_queue.put((cid, artist, name))
+
+        if artist:
+            disco = self.discography[artist]
+            if metadata.get("title"):
+                disco["albums"].append(metadata["title"].strip())
+            disco["tracks"].extend(tracks)
+            if self._needs_check(artist, final=False):
+                await self._queue_artist(artist)
+
+    def _needs_check(self, artist, final):
+        """Unverified artist never checked, or (re)checkable now that its discography grew."""
+        if artist in self.seen_artists or artist in self.queued_artists:
+            return False
+        checked = self.checked_with.get(artist)
+        if checked is None:
+            return True
+        collections = len(self.discography[artist]["albums"])
+        # While scraping, re-check on doubling to bound the calls; the final pass catches any growth
+        return collections > checked if final else collections >= 2 * checked
+
+    async def _queue_artist(self, artist):
+        self.queued_artists.add(artist)
+        await self.artist_queue.put(artist)
+
+    def _track_done(self, cid):
+        self.pending[cid] -= 1
+        if self.pending[cid] == 0:
+            latency = time.time() - self.first_seen.pop(cid)
+            self.release_latency.append(latency)
+            RELEASE_SECONDS.observe(latency)
+            del self.pending[cid]
+
+    async def run_throttled(self, pool, fn, *args):
+        """fn(*args) in pool, retried while the shared circuit breaker reports throttling.
+
+        The breaker pauses every worker while it is open, so a retry waits for
+        the cooldown instead of hammering the API. Raises Throttled after MAX_REQUEUES.
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(MAX_REQUEUES + 1):
+            try:
+                return await loop.run_in_executor(pool, fn, *args)
+            except Throttled:
+                if attempt == MAX_REQUEUES:
+                    self.counters["deferred"] += 1
+                    raise
+                self.counters["requeued"] += 1
+
+    async def link_worker(self):
+        while True:
+            item = await self.link_queue.get()
+            QUEUE_DEPTH.set(self.link_queue.qsize(), stage="link")
+            try:
+                if item is _DONE:
+                    return
+                cid, artist, name = item
+                key = f"{artist}|{name}"
+                if self.youtube_links.get(key):
+                    self.counters["cached"] += 1
+                else:
+                    try:
+                        vid = await self.run_throttled(self.link_pool, links.resolve_track, artist, name)
+                    except Throttled as e:
+                        # Not recorded, so the next run resolves it again
+                        links.log_event("deferred", artist, name, error=str(e)[:200])
+                        self._track_done(cid)
+                        continue
+                    except links.SearchFailed:
+                        # Logged by the search; neither a link nor a miss
+                        self.counters["errored"] += 1
+                        self._track_done(cid)
+                        continue
+                    self.counters["tracks"] += 1
+                    if vid:
+                        self.youtube_links[key] = {
+                            "artist": artist,
+                            "track": name,
+                            "url": f"https://music.youtube.com/watch?v={vid}"
+                        }
+                        self.counters["found"] += 1
+                        log.debug(f"✓ Linked: {artist} - {name}")
+                    else:
+                        await self.run_io(links.log_not_found, artist, name)
+                        self.counters["not_found"] += 1
+                        log.debug(f"✗ Not found: {artist} - {name}")
+                    if self.counters["tracks"] % LINKS_SAVE_EVERY == 0:
+                        await self.run_io(links.save_json, self.links_snapshot(), self.links_file)
+                self._track_done(cid)
+                self.progress.emit(self.render_progress)
+            finally:
+                self.link_queue.task_done()
+
+    async def artist_worker(self):
+        while True:
+            artist = await self.artist_queue.get()
+            QUEUE_DEPTH.set(self.artist_queue.qsize(), stage="artist")
+            try:
+                if artist is _DONE:
+                    return
+                self.queued_artists.discard(artist)
+                disco = self.discography[artist]
+                collections = len(disco["albums"])
+                snapshot = {"albums": list(dict.fromkeys(disco["albums"])),
+                            "tracks": list(dict.fromkeys(disco["tracks"]))}
+                try:
+                    result = await self.run_throttled(self.artist_pool, verifier.process_artist, artist, snapshot)
+                except Throttled:
+                    log.debug(f"⏸ Artist deferred (throttled): {artist}")
+                    continue
+                self.counters["artists_checked"] += 1
+                self.checked_with[artist] = collections
+                if result and result["confidence"]["total"] >= CONFIDENCE_THRESHOLD:
+                    self.verified.append({"id": result["channelId"], "name": artist})
+                    self.seen_artists.add(artist)
+                    self.counters["artists_verified"] += 1
+                    await self.run_io(self.save_artists, list(self.verified))
+                    log.debug(f"✓ Verified artist: {artist} → {result['channelId']} "
+                          f"({result['confidence']['total']}%)")
+                else:
+                    log.debug(f"✗ Artist skipped: {artist}")
+            finally:
+                self.artist_queue.task_done()
+
+    def render_progress(self):
+        c = self.counters
+        return (f"[Pipeline] collections {c['collections']} | links ✓{c['found']} ✗{c['not_found']} "
+                f"(cached {c['cached']}) | artists ✓{c['artists_verified']}/{c['artists_checked']} | "
+                f"queues link {self.link_queue.qsize()} artist {self.artist_queue.qsize()}"
+                + (f" | ⏸ requeued {c['requeued']} deferred {c['deferred']}" if c["requeued"] else ""))
+
+    async def run_io(self, fn, *args):
+        await asyncio.get_running_loop().run_in_executor(self.io_pool, fn, *args)
+
+    def links_snapshot(self):
+        """Found links, copied on the event loop so the I/O thread never sees the dict change."""
+        return {k: v for k, v in self.youtube_links.items() if v is not None}
+
+    def save_links(self):
+        links.save_json(self.links_snapshot(), self.links_file)
+
+    def save_artists(self, verified=None):
+        save_output({"artists": self.verified if verified is None else verified}, self.artists_file,
+                    self.fmt, self.precompress)
+
+    async def run(self, start_id, end_id, scrape_kwargs):
+        workers = [asyncio.create_task(self.link_worker()) for _ in range(self.link_workers)]
+        workers += [asyncio.create_task(self.artist_worker()) for _ in range(self.artist_workers)]
+
+        try:
+            await scraper.scrape_collections(start_id, end_id, on_result=self.on_collection, **scrape_kwargs)
+
+            # Final pass: re-check unverified artists whose discography grew since their last check
+            await self.artist_queue.join()
+            for artist in list(self.discography):
+                if self._needs_check(artist, final=True):
+                    await self._queue_artist(artist)
+
+            # Drain: one sentinel per worker once everything queued has been handled
+            for _ in range(self.link_workers):
+                await self.link_queue.put(_DONE)
+            for _ in range(self.artist_workers):
+                await self.artist_queue.put(_DONE)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            self.link_pool.shutdown(wait=False, cancel_futures=True)
+            self.artist_pool.shutdown(wait=False, cancel_futures=True)
+            self.io_pool.shutdown(wait=True)
+            if links.channels is not None:
+                links.channels.save()
+            self.save_links()
+            self.save_artists()
+
+# -----------------------
+# Main
+# -----------------------
+def main():
+    parser = argparse.ArgumentParser(description="Stream new 24six collections through link resolution and artist verification")
+    parser.add_argument("--start", type=int, default=1, help="Starting collection ID (default: 1)")
+    parser.add_argument("--end", type=int, default=20000, help="Ending collection ID (default: 20000)")
+    parser.add_argument("--output", default="metadata.json", help="Scraper JSON output (default: metadata.json)")
+    parser.add_argument("--concurrency", type=int, default=40, help="Concurrent scrape requests (default: 40)")
+    parser.add_argument("--link-workers", type=int, default=LINK_WORKERS, help=f"Link resolver threads (default: {LINK_WORKERS})")
+    parser.add_argument("--artist-workers", type=int, default=ARTIST_WORKERS, help=f"Artist verifier threads (default: {ARTIST_WORKERS})")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help=f"Bound for each stage queue (default: {QUEUE_SIZE})")
+    parser.add_argument("--links-output", default=links.OUTPUT_FILE, help=f"Links file (default: {links.OUTPUT_FILE})")
+    parser.add_argument("--artists-output", default=ARTISTS_OUTPUT, help=f"Verified artists file (default: {ARTISTS_OUTPUT})")
+    parser.add_argument("--format", choices=FORMATS, default="pretty", help="Output format for all files (default: pretty)")
+    parser.add_argument("--precompress", type=parse_precompress, default=(), help="Also write compressed siblings, e.g. gz,br")
+    parser.add_argument("--artists", help="Verified artists (e.g. artists.json) for channel-scoped track resolution")
+    progress_log.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.start > args.end:
+        print("Error: start ID must be less than or equal to end ID", file=sys.stderr)
+        sys.exit(1)
+    if min(args.concurrency, args.link_workers, args.artist_workers, args.queue_size) < 1:
+        print("Error: concurrency, workers and queue size must be at least 1", file=sys.stderr)
+        sys.exit(1)
+
+    # Both outputs are rewritten at the end; an unreadable one must not be replaced by this run's results
+    path = args.links_output
+    try:
+        youtube_links = links.load_json(path)
+        path = args.artists_output
+        verified = load_output(path, default={"artists": []}).get("artists", [])
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot read {path} ({e}); refusing to overwrite it", file=sys.stderr)
+        sys.exit(1)
+
+    links.OUTPUT_FORMAT, links.PRECOMPRESS = args.format, args.precompress
+    # Each stage's client pool keeps one keep-alive connection per worker thread
+    links.ytm.configure(args.link_workers)
+    verifier.ytm.configure(args.artist_workers)
+    if args.artists:
+        links.enable_channel_scope(args.artists)
+    pipeline = Pipeline(args.link_workers, args.artist_workers, args.queue_size, youtube_links, verified,
+                        args.links_output, args.artists_output, args.format, args.precompress)
+    scrape_kwargs = {"output_file": args.output, "concurrency": args.concurrency,
+                     "json_only": True, "output_format": args.format, "precompress": args.precompress}
+
+    finish_metrics = metrics.start_from_args(args)
+    progress_log.setup_logging(args.verbose)
+    start = time.time()
+    try:
+        asyncio.run(pipeline.run(args.start, args.end, scrape_kwargs))
+    except KeyboardInterrupt:
+        print("\n\nPipeline interrupted by user. Partial results have been saved.")
+        sys.exit(0)
+    finally:
+        finish_metrics()
+
+    progress_log.flush_logging()
+    c = pipeline.counters
+    lat = pipeline.release_latency
+    print("\n" + "=" * 60)
+    print(f"Pipeline complete in {time.time() - start:.1f}s")
+    print(f"Collections: {c['collections']} | Tracks searched: {c['tracks']} "
+          f"(found {c['found']}, missing {c['not_found']}, cached {c['cached']}"
+          + (f", {c['errored']} errored and left for the next run" if c["errored"] else "") + ")")
+    print(f"Artists checked: {c['artists_checked']} | verified: {c['artists_verified']}")
+    print(f"YTMusic clients: links {links.ytm.summary()} | artists {verifier.ytm.summary()}")
+    if c["requeued"]:
+        print(f"Throttling: {c['requeued']} retries, {c['deferred']} items deferred to the next run")
+    if lat:
+        print(f"Release latency (scrape → all tracks linked): "
+              f"p50 {percentile(lat, 50):.1f}s | p99 {percentile(lat, 99):.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Profiling
+=========
+
+Opt-in per-run hotspot report for all scripts (--profile DIR).
+
+- stage(name): cProfile of a section in the current thread -> DIR/<name>.prof
+- wrap(fn, stage): cProfile every call of fn on whichever worker thread runs it;
+  per-thread profiles are merged into one DIR/<stage>.prof
+- Python 3.12+ allows one active cProfile per process: there, worker threads are
+  not cProfiled (the sampler covers them) and a stage entered while another
+  thread is profiling is skipped and named in the report
+- block(name): wall time of a synchronous section (count/total/p99/max)
+- start_loop_monitor(): asyncio task measuring event-loop lag and naming the
+  blocks that ran while the loop was late
+- Sampler: samples every thread's stack (catches I/O waits and lock contention
+  that cProfile does not) -> DIR/samples.folded (flamegraph.pl / speedscope)
+- DIR/report.txt ties it together
+
+Everything is a no-op until start_from_args() sees --profile, so the hooks can
+stay in the hot path.
+"""
+
+import asyncio
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+SAMPLE_INTERVAL = 0.005
+LOOP_TICK = 0.05
+LAG_THRESHOLD = 0.05
+TOP_FUNCTIONS = 15
+# cProfile sits on sys.monitoring from 3.12 on, which takes a single profiler per process
+SINGLE_PROFILER = sys.version_info >= (3, 12)
+
+def _thread_group(name):
+    """'ThreadPoolExecutor-0_3' -> 'ThreadPoolExecutor-0', 'link_2' -> 'link'"""
+    return re.sub(r"[_-]\d+$", "", name)
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+# -----------------------
+# Sampler
+# -----------------------
+class Sampler:
+    """Background thread recording collapsed stacks of every other thread."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, max_depth=40):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                group = _thread_group(names.get(ident, str(ident)))
+                self.stacks[";".join([group] + stack[::-1])] += 1
+            self.samples += 1
+
+    def write_folded(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top_frames(self, limit=TOP_FUNCTIONS):
+        """Most sampled innermost frames per thread group (where time is actually spent)."""
+        by_group = defaultdict(Counter)
+        for stack, count in self.stacks.items():
+            parts = stack.split(";")
+            by_group[parts[0]][parts[-1]] += count
+        return {group: frames.most_common(limit) for group, frames in by_group.items()}
+
+# -----------------------
+# Profiler
+# -----------------------
+class _Block:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record_block(self.name, time.perf_counter() - self.start)
+        return False
+
+class _NullBlock:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_BLOCK = _NullBlock()
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.out_dir = None
+        self.sampler = None
+        self.started = None
+        self._profiles = {}           # (stage, thread name) -> cProfile.Profile
+        self._active = threading.local()
+        self._owner = None            # thread holding the cProfile slot (SINGLE_PROFILER)
+        self._skipped = set()         # stages that could not be cProfiled
+        self._blocks = defaultdict(list)
+        self._recent = []             # blocks finished since the last loop tick
+        self._lag = []
+        self._lag_events = []
+        self._lock = threading.Lock()
+
+    def start(self, out_dir, sample_interval=SAMPLE_INTERVAL):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.enabled = True
+        self.started = time.time()
+        if sample_interval:
+            self.sampler = Sampler(sample_interval)
+            self.sampler.start()
+
+    def _profile_for(self, stage):
+        key = (stage, threading.current_thread().name)
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                profile = self._profiles[key] = cProfile.Profile()
+        return profile
+
+    def _acquire(self, stage):
+        """Claim the process-wide cProfile slot where there is only one."""
+        if not SINGLE_PROFILER:
+            return True
+        with self._lock:
+            if self._owner is None:
+                self._owner = threading.get_ident()
+                return True
+            self._skipped.add(stage)
+            return False
+
+    def _release(self):
+        if SINGLE_PROFILER:
+            with self._lock:
+                self._owner = None
+
+    def _record_block(self, name, seconds):
+        with self._lock:
+            self._blocks[name].append(seconds)
+            self._recent.append((name, seconds))
+
+    def block(self, name):
+        """Time a synchronous section (e.g. a save or a parse)."""
+        return _Block(self, name) if self.enabled else _NULL_BLOCK
+
+    def stage(self, name):
+        """cProfile the with-block in the current thread (nested stages are folded into the outer one)."""
+        if not self.enabled or getattr(self._active, "stage", None):
+            return _NULL_BLOCK
+        return _Stage(self, name)
+
+    def wrap(self, fn, stage):
+        """fn, cProfiled per call on the calling (worker) thread (left unprofiled on 3.12+)."""
+        if not self.enabled:
+            return fn
+        if SINGLE_PROFILER:
+            with self._lock:
+                self._skipped.add(stage)
+            return fn
+
+        def profiled(*args, **kwargs):
+            with self.stage(stage):
+                return fn(*args, **kwargs)
+        return profiled
+
+    async def _monitor_loop(self, tick, threshold):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + tick
+            await asyncio.sleep(tick)
+            lag = max(0.0, loop.time() - expected)
+            with self._lock:
+                recent, self._recent = self._recent, []
+                self._lag.append(lag)
+                if lag >= threshold:
+                    totals = Counter()
+                    for name, seconds in recent:
+                        totals[name] += seconds
+                    self._lag_events.append({"at": round(time.time() - self.started, 3), "lag": lag,
+                                             "blocks": totals.most_common(3)})
+
+    def start_loop_monitor(self, tick=LOOP_TICK, threshold=LAG_THRESHOLD):
+        """Start the event-loop lag monitor on the running loop; returns the task (or None)."""
+        if not self.enabled:
+            return None
+        return asyncio.ensure_future(self._monitor_loop(tick, threshold))
+
+    # -----------------------
+    # Report
+    # -----------------------
+    def _merged_stats(self):
+        by_stage = defaultdict(list)
+        with self._lock:
+            for (stage, thread), profile in self._profiles.items():
+                by_stage[stage].append((thread, profile))
+        merged = {}
+        for stage, profiles in by_stage.items():
+            stats = None
+            for _, profile in profiles:
+                profile.create_stats()
+                if not profile.stats:
+                    continue
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            if stats is not None:
+                merged[stage] = (stats, len(profiles))
+        return merged
+
+    def write_report(self):
+        if not self.enabled:
+            return None
+        if self.sampler:
+            self.sampler.stop()
+        wall = time.time() - self.started
+        lines = [f"Profile report ({wall:.1f}s wall, {' '.join(sys.argv)})", ""]
+        summary = {"wall_s": round(wall, 3), "stages": {}, "blocks": {}, "loop_lag": None}
+
+        # Blocking sections
+        if self._blocks:
+            lines.append("Blocking sections (wall time)")
+            lines.append(f"  {'section':<24}{'count':>8}{'total s':>10}{'share':>8}{'p99 ms':>10}{'max ms':>10}")
+            for name, values in sorted(self._blocks.items(), key=lambda kv: -sum(kv[1])):
+                total = sum(values)
+                lines.append(f"  {name:<24}{len(values):>8}{total:>10.3f}{total / wall * 100:>7.1f}%"
+                             f"{_percentile(values, 99) * 1000:>10.2f}{max(values) * 1000:>10.2f}")
+                summary["blocks"][name] = {"count": len(values), "total_s": round(total, 6),
+                                           "p99_ms": round(_percentile(values, 99) * 1000, 3)}
+            lines.append("")
+
+        # Event loop
+        if self._lag:
+            lag = self._lag
+            lines.append(f"Event-loop lag ({len(lag)} ticks of {LOOP_TICK * 1000:.0f}ms)")
+            lines.append(f"  p50 {_percentile(lag, 50) * 1000:.1f}ms | p99 {_percentile(lag, 99) * 1000:.1f}ms | "
+                         f"max {max(lag) * 1000:.1f}ms | late ticks (>= {LAG_THRESHOLD * 1000:.0f}ms): {len(self._lag_events)}")
+            for event in sorted(self._lag_events, key=lambda e: -e["lag"])[:10]:
+                blocks = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in event["blocks"]) or "unattributed"
+                lines.append(f"  +{event['at']:>8.2f}s  lag {event['lag'] * 1000:7.1f}ms  <- {blocks}")
+            lines.append("")
+            summary["loop_lag"] = {"p50_ms": round(_percentile(lag, 50) * 1000, 3),
+                                   "p99_ms": round(_percentile(lag, 99) * 1000, 3),
+                                   "max_ms": round(max(lag) * 1000, 3), "late_ticks": len(self._lag_events)}
+
+        # cProfile per stage
+        for stage, (stats, threads) in sorted(self._merged_stats().items()):
+            path = os.path.join(self.out_dir, f"{stage}.prof")
+            stats.dump_stats(path)
+            buffer = io.StringIO()
+            stats.stream = buffer
+            stats.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+            body = buffer.getvalue()
+            body = body[body.find("   ncalls"):] if "   ncalls" in body else body
+            lines.append(f"Stage '{stage}' (cProfile, {threads} thread(s), {stats.total_tt:.3f}s in profiled calls) -> {path}")
+            lines.extend("  " + line for line in body.rstrip().splitlines())
+            lines.append("")
+            summary["stages"][stage] = {"threads": threads, "profiled_s": round(stats.total_tt, 6), "file": path}
+
+        if self._skipped:
+            lines.append(f"Not cProfiled: {', '.join(sorted(self._skipped))} (Python {sys.version_info[0]}.{sys.version_info[1]} "
+                         f"allows one profiler per process; see the sampled stacks)")
+            lines.append("")
+            summary["skipped_stages"] = sorted(self._skipped)
+
+        # Sampled stacks
+        if self.sampler and self.sampler.samples:
+            folded = os.path.join(self.out_dir, "samples.folded")
+            self.sampler.write_folded(folded)
+            lines.append(f"Sampled stacks ({self.sampler.samples} samples every {self.sampler.interval * 1000:.0f}ms, "
+                         f"waits included) -> {folded}")
+            for group, frames in sorted(self.sampler.top_frames().items()):
+                group_total = sum(c for s, c in self.sampler.stacks.items() if s.split(";", 1)[0] == group)
+                lines.append(f"  [{group}]")
+                for frame, count in frames[:8]:
+                    lines.append(f"    {count / group_total * 100:5.1f}%  {frame}")
+            lines.append("")
+
+        report = os.path.join(self.out_dir, "report.txt")
+        with open(report, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        with open(os.path.join(self.out_dir, "report.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return report
+
+class _Stage:
+    __slots__ = ("profiler", "name", "profile")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profile = None
+        if not self.profiler._acquire(self.name):
+            return self
+        profile = self.profiler._profile_for(self.name)
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler or debugger already holds sys.monitoring
+            self.profiler._release()
+            with self.profiler._lock:
+                self.profiler._skipped.add(self.name)
+            return self
+        self.profile = profile
+        self.profiler._active.stage = self.name
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.disable()
+            self.profiler._active.stage = None
+            self.profiler._release()
+        return False
+
+PROFILER = Profiler()
+block = PROFILER.block
+stage = PROFILER.stage
+wrap = PROFILER.wrap
+start_loop_monitor = PROFILER.start_loop_monitor
+
+# -----------------------
+# CLI helpers
+# -----------------------
+def add_arguments(parser):
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", metavar="DIR", help="Write per-stage cProfile dumps, sampled stacks and report.txt to DIR")
+    group.add_argument("--profile-sample-ms", type=float, default=SAMPLE_INTERVAL * 1000,
+                       help=f"Stack sampling interval, 0 to disable (default: {SAMPLE_INTERVAL * 1000:.0f})")
+
+def start_from_args(args):
+    """Enable profiling if --profile was given; returns a callable that writes the report."""
+    if args.profile:
+        PROFILER.start(args.profile, args.profile_sample_ms / 1000)
+        print(f"Profiling to {args.profile}/")
+
+    def finish():
+        report = PROFILER.write_report()
+        if report:
+            print(f"Profile report: {report}")
+    return finish
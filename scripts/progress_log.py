@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Progress Logging
+================
+
+Keeps console and log-file I/O off the hot path.
+
+- setup_logging(): records go through a QueueHandler; a background
+  QueueListener thread does the actual (blocking) writes to stdout
+- Per-item lines are DEBUG and only shown with -v/--verbose
+- Without setup_logging() (library callers) INFO lines are still printed to
+  stdout, unless the host application has configured logging itself
+- ProgressLine: one summary line at most every N seconds
+- BufferedLog / StructuredLog: miss and error logs buffered in memory and
+  flushed in batches by a background thread instead of one open() per line
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+LOGGER_NAME = "ytmusicjson"
+log = logging.getLogger(LOGGER_NAME)
+
+_listener = None
+
+class _FallbackHandler(logging.Handler):
+    """Print records until setup_logging() runs, unless the root logger has handlers."""
+
+    def emit(self, record):
+        if logging.getLogger().handlers:
+            return  # the record propagates to the host application's handlers
+        try:
+            sys.stdout.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+
+# Python's last-resort handler only shows WARNING and above, which would hide progress
+log.addHandler(_FallbackHandler())
+log.setLevel(logging.INFO)
+
+def setup_logging(verbose=False):
+    """Route the shared logger through a background writer thread."""
+    global _listener
+    if _listener is not None:
+        log.setLevel(logging.DEBUG if verbose else logging.INFO)
+        return log
+
+    records = queue.SimpleQueue()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    _listener = logging.handlers.QueueListener(records, console, respect_handler_level=False)
+    _listener.start()
+
+    log.handlers[:] = [logging.handlers.QueueHandler(records)]
+    log.setLevel(logging.DEBUG if verbose else logging.INFO)
+    log.propagate = False
+    atexit.register(shutdown_logging)
+    return log
+
+def flush_logging():
+    """Block until every queued record has been written."""
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+def shutdown_logging():
+    """Flush and stop the background writer (safe to call more than once)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def add_arguments(parser):
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every item, not just periodic progress")
+
+class ProgressLine:
+    """Emit a progress line at most once every interval seconds."""
+
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def due(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last < self.interval:
+                return False
+            self._last = now
+            return True
+
+    def emit(self, render, force=False):
+        """Log render() if the interval has passed; render is only called when due."""
+        if force or self.due():
+            log.info(render())
+
+class BufferedLog:
+    """Append-only text log written in batches from a background thread."""
+
+    def __init__(self, path, truncate=False, flush_every=500, flush_interval=5.0):
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        if truncate:
+            open(path, "w", encoding="utf-8").close()
+        self._thread = threading.Thread(target=self._run, args=(flush_interval,),
+                                        name=f"log-{path}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, line):
+        with self._lock:
+            self._buffer.append(line)
+            full = len(self._buffer) >= self.flush_every
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if lines:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(line + "\n" for line in lines))
+
+    def _run(self, interval):
+        while not self._closed:
+            self._wake.wait(interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._wake.set()
+            self._thread.join(timeout=5)
+            self.flush()
+
+class StructuredLog(BufferedLog):
+    """BufferedLog of JSON lines: one object per event with a timestamp and kind."""
+
+    def record(self, kind, **fields):
+        self.write(json.dumps({"ts": round(time.time(), 3), "kind": kind, **fields}, ensure_ascii=False))
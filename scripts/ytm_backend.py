@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+YouTube Music Search Backends
+=============================
+
+- "live": the real ytmusicapi.YTMusic client (default)
+- "fake": deterministic local stand-in with canned search/get_artist/get_album/
+          get_playlist responses, configurable latency and failure rate, for
+          offline benchmarks
+
+Select with the YTM_BACKEND environment variable (live | fake) or by passing
+a backend name to create_client().
+
+ClientPool hands each worker thread its own lazily created client; live
+clients share one keep-alive requests.Session whose connection pool is sized
+to the worker count (and whose requests time out after HTTP_TIMEOUT seconds),
+and connection_stats() reports how well it is reused. The fake backend is
+thread-safe and shared by all threads, like the upstream it stands in for.
+"""
+
+import base64
+import functools
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+import metrics
+
+BACKEND_ENV = "YTM_BACKEND"
+BACKENDS = ("live", "fake")
+POOL_HOSTS = 4           # distinct hosts kept in the session's pool manager
+HTTP_TIMEOUT = 30        # seconds; requests has no default, a stalled socket would hang a worker
+
+HTTP_CONNECTIONS = metrics.gauge("ytm_http_connections", "HTTP connections opened by a client pool")
+HTTP_REQUESTS = metrics.gauge("ytm_http_requests", "HTTP requests sent by a client pool")
+POOL_CLIENTS = metrics.gauge("ytm_pool_clients", "Per-thread clients created by a client pool")
+
+def create_client(backend=None, **options):
+    """Return a client exposing search(), get_artist(), get_album() and get_playlist() for the chosen backend."""
+    backend = backend or os.environ.get(BACKEND_ENV, "live")
+    if backend == "live":
+        from ytmusicapi import YTMusic
+        return YTMusic(**options)
+    if backend == "fake":
+        return FakeYTMusic(**options)
+    raise ValueError(f"unknown ytmusic backend '{backend}' (choose from {', '.join(BACKENDS)})")
+
+# -----------------------
+# Per-thread client pool
+# -----------------------
+class ClientPool:
+    """
+    Lazily created client per worker thread.
+
+    - Nothing is constructed until a thread first calls through the pool, so
+      importing a script (or running it with --help) never builds a client
+    - Each thread gets its own live client, so no two workers share one client's
+      mutable request state
+    - Live clients share one keep-alive requests.Session whose adapter keeps
+      up to `workers` connections per host, so concurrent workers reuse
+      connections instead of opening and discarding extras
+    - Fake clients are one shared instance, so channel/album IDs handed out on
+      one thread resolve on every other and throttle windows are process-wide
+
+    Attribute access is forwarded to the calling thread's client (pool.search(...)).
+    """
+
+    def __init__(self, name, backend=None, workers=8, **options):
+        self.name = name
+        self.backend = backend
+        self.workers = workers
+        self.options = options
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._session = None
+        self._shared = None      # the one fake client all threads use
+        self._clients = 0
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.client(), attr)
+
+    def configure(self, workers):
+        """Size the HTTP pool for workers threads (remounts the adapter if the session exists)."""
+        with self._lock:
+            self.workers = workers
+            if self._session is not None:
+                self._mount(self._session)
+
+    def _mount(self, session):
+        from requests.adapters import HTTPAdapter
+        adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=max(1, self.workers))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+    def client(self):
+        """This thread's client, created on first use."""
+        client = getattr(self._local, "client", None)
+        if client is not None:
+            return client
+        backend = self.backend or os.environ.get(BACKEND_ENV, "live")
+        options = dict(self.options)
+        with self._lock:
+            if backend != "live":
+                if self._shared is None:
+                    self._shared = create_client(backend, **options)
+                    self._clients += 1
+                client = self._local.client = self._shared
+                return client
+            if self._session is None:
+                import requests
+                self._session = requests.Session()
+                # Explicit timeouts passed by ytmusicapi still win over this default
+                self._session.request = functools.partial(self._session.request, timeout=HTTP_TIMEOUT)
+                self._mount(self._session)
+            options["requests_session"] = self._session
+            self._clients += 1
+        client = self._local.client = create_client(backend, **options)
+        return client
+
+    def connection_stats(self):
+        """Clients created and, for live clients, per-host connection/request counts."""
+        with self._lock:
+            clients, session = self._clients, self._session
+        hosts = {}
+        adapters = {id(a): a for a in session.adapters.values()}.values() if session is not None else ()
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = hosts.setdefault(pool.host, {"connections": 0, "requests": 0, "idle": 0})
+                host["connections"] += pool.num_connections
+                host["requests"] += pool.num_requests
+                host["idle"] += pool.pool.qsize() if pool.pool is not None else 0
+        connections = sum(h["connections"] for h in hosts.values())
+        requests_sent = sum(h["requests"] for h in hosts.values())
+        POOL_CLIENTS.set(clients, pool=self.name)
+        HTTP_CONNECTIONS.set(connections, pool=self.name)
+        HTTP_REQUESTS.set(requests_sent, pool=self.name)
+        return {"clients": clients, "workers": self.workers, "connections": connections,
+                "requests": requests_sent, "reused": max(0, requests_sent - connections), "hosts": hosts}
+
+    def summary(self):
+        """One-line connection report for the end of a run."""
+        stats = self.connection_stats()
+        line = f"{stats['clients']} client{'s' if stats['clients'] != 1 else ''}"
+        if stats["requests"]:
+            line += (f", {stats['requests']} HTTP requests over {stats['connections']} connections "
+                     f"({stats['reused'] / stats['requests'] * 100:.0f}% reused, pool size {stats['workers']})")
+        return line
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+# -----------------------
+# Fake backend
+# -----------------------
+def _fraction(seed, *parts):
+    digest = hashlib.sha1(f"{seed}:{':'.join(map(str, parts))}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+def _token(seed, length, *parts):
+    digest = hashlib.sha1(f"{seed}:{':'.join(map(str, parts))}".encode("utf-8")).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")[:length]
+
+class FakeYTMusic:
+    """
+    Deterministic offline stand-in for ytmusicapi.YTMusic.
+
+    The same query always yields the same answer for a given seed:
+    - hit_rate of song queries resolve to a matching result
+    - songs_share of those hits are found with filter="songs", the rest only
+      with filter="videos" (forcing the second search like the live API)
+    - failure_rate of calls raise a transient "Expecting value" error
+    - catalogue (optional) maps artist name -> album titles served by get_artist,
+      or -> {album title: [track names]} to also serve album/playlist tracks
+    - channel_coverage of an artist's catalogued tracks are on their channel;
+      their videoIds match what search() returns for "artist track"
+    - throttle_every (optional): after every that many served calls a
+      throttle_s second window opens in which every call raises
+      "HTTP 429: Too Many Requests"
+    """
+
+    def __init__(self, seed=1, latency_ms=0.0, jitter_ms=0.0, failure_rate=0.0,
+                 hit_rate=0.8, songs_share=0.8, artist_hit_rate=0.9, catalogue=None,
+                 channel_coverage=0.9, throttle_every=0, throttle_s=2.0):
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.hit_rate = hit_rate
+        self.songs_share = songs_share
+        self.artist_hit_rate = artist_hit_rate
+        self.catalogue = catalogue or {}
+        self.channel_coverage = channel_coverage
+        self.throttle_every = throttle_every
+        self.throttle_s = throttle_s
+        self._throttled_until = 0.0
+        self._served = 0
+        self.calls = Counter()
+        self._channels = {}
+        self._browse = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        for artist in self.catalogue:
+            self.channel_id(artist)
+
+    def _call(self, method):
+        with self._lock:
+            self.calls[method] += 1
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._rng.random() < self.failure_rate
+            throttled = time.monotonic() < self._throttled_until
+            if throttled:
+                self.calls["throttled"] += 1
+            elif self.throttle_every:
+                self._served += 1
+                if self._served % self.throttle_every == 0:
+                    self._throttled_until = time.monotonic() + self.throttle_s
+        if throttled:
+            raise Exception("Server returned HTTP 429: Too Many Requests.")
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.calls["failures"] += 1
+            raise Exception("Expecting value: line 1 column 1 (char 0)")
+
+    def channel_id(self, artist):
+        """The (stable) channel ID the fake uses for an artist."""
+        channel_id = "UC" + _token(self.seed, 22, "channel", artist)
+        with self._lock:
+            self._channels[channel_id] = artist
+        return channel_id
+
+    def _albums(self, artist):
+        albums = self.catalogue.get(artist, [])
+        return albums if isinstance(albums, dict) else {title: [] for title in albums}
+
+    def _track_item(self, artist, name):
+        return {"title": name, "videoId": _token(self.seed, 11, "video", f"{artist} {name}"),
+                "artists": [{"name": artist}]}
+
+    def _channel_tracks(self, artist, tracks):
+        return [self._track_item(artist, name) for name in tracks
+                if _fraction(self.seed, "channel", artist, name) < self.channel_coverage]
+
+    def search(self, query, filter=None, limit=20, **kwargs):
+        self._call("search")
+        if filter == "artists":
+            artist = query[:-len(" - Topic")] if query.endswith(" - Topic") else query
+            if _fraction(self.seed, "artist", artist) >= self.artist_hit_rate:
+                return []
+            return [{"browseId": self.channel_id(artist), "artist": artist, "resultType": "artist"}]
+
+        roll = _fraction(self.seed, "track", query)
+        hit = roll < self.hit_rate
+        on_songs = roll < self.hit_rate * self.songs_share
+        if hit and (filter != "songs" or on_songs):
+            return [{"title": query, "videoId": _token(self.seed, 11, "video", query),
+                     "artists": [], "resultType": filter or "song"}]
+        if filter == "songs" and not hit:
+            # A result without a playable video, like the live API returning a podcast/episode
+            return [{"title": query, "videoId": None, "artists": [], "resultType": "episode"}]
+        return []
+
+    def get_artist(self, channelId):
+        self._call("get_artist")
+        artist = self._channels.get(channelId, "")
+        albums = self._albums(artist)
+        results = []
+        for title in albums:
+            browse_id = "MPRE" + _token(self.seed, 12, "album", artist, title)
+            results.append({"title": title, "browseId": browse_id})
+            with self._lock:
+                self._browse[browse_id] = (artist, title)
+        playlist_id = "VL" + _token(self.seed, 16, "songs", artist)
+        with self._lock:
+            self._browse[playlist_id] = (artist, None)
+        songs = [t for tracks in albums.values() for t in tracks]
+        return {
+            "name": artist,
+            "channelId": channelId,
+            "albums": {"results": results},
+            "singles": {"results": []},
+            "songs": {"browseId": playlist_id, "results": self._channel_tracks(artist, songs)[:5]},
+        }
+
+    def get_album(self, browseId):
+        self._call("get_album")
+        artist, title = self._browse.get(browseId, ("", ""))
+        tracks = self._albums(artist).get(title, [])
+        return {"title": title, "artists": [{"name": artist}], "tracks": self._channel_tracks(artist, tracks)}
+
+    def get_playlist(self, playlistId, limit=100):
+        self._call("get_playlist")
+        key = playlistId if playlistId.startswith("VL") else "VL" + playlistId
+        artist, _ = self._browse.get(key, ("", None))
+        songs = [t for tracks in self._albums(artist).values() for t in tracks]
+        tracks = self._channel_tracks(artist, songs)
+        return {"id": playlistId, "tracks": tracks if limit is None else tracks[:limit]}
+
+    def stats(self):
+        with self._lock:
+            return dict(self.calls)